@@ -0,0 +1,120 @@
+# forest.py
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Parity tolerance against sklearn: only the order of the final sum differs
+PARITY_RTOL = 1e-9
+PARITY_ATOL = 1e-6
+
+# Node arrays, each stored as its own memory-mappable .npy file
+ARRAY_FIELDS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+@dataclass(frozen=True)
+class FlatForest:
+    """
+    A fitted RandomForestRegressor flattened into contiguous node arrays (all
+    trees concatenated). Leaves point to themselves, so every row can take
+    `max_depth` steps in lockstep without branching on leaf-ness.
+    """
+    feature: np.ndarray  # int32, split feature per node (0 for leaves)
+    threshold: np.ndarray  # float64, go left when x <= threshold
+    left: np.ndarray  # int32, global index of the left child
+    right: np.ndarray  # int32, global index of the right child
+    value: np.ndarray  # float64, leaf prediction per node
+    roots: np.ndarray  # int32, root node of each tree
+    max_depth: int
+    n_features: int
+    model_version: Optional[str] = None
+
+    def predict(self, X) -> np.ndarray:
+        """Same result as the source model's `predict` for a 2-D feature array."""
+        # sklearn compares float32 inputs against float64 thresholds; match it
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0]))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=1)
+
+    def save(self, directory: Path):
+        """
+        One uncompressed `.npy` per array plus `meta.json`, so `load` can
+        memory-map the arrays instead of reading them into each process.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAY_FIELDS:
+            np.save(directory / f"{name}.npy", getattr(self, name), allow_pickle=False)
+        meta = {
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "model_version": self.model_version,
+        }
+        (directory / "meta.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def load(cls, directory: Path, mmap_mode: Optional[str] = "r") -> "FlatForest":
+        """
+        Read a forest written by `save`. With the default read-only mapping,
+        processes loading the same files share one copy in the page cache.
+        """
+        meta = json.loads((directory / "meta.json").read_text())
+        arrays = {
+            # Plain ndarray views over the mapping; indexing them stays copy-free
+            name: np.asarray(np.load(directory / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False))
+            for name in ARRAY_FIELDS
+        }
+        return cls(**arrays, **meta)
+
+
+def export_forest(model, model_version: Optional[str] = None) -> FlatForest:
+    """Flatten a fitted single-output RandomForestRegressor (or any tree ensemble of it)."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(offset, offset + n_nodes, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32))
+        values.append(tree.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n_nodes
+
+    return FlatForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=int(max_depth),
+        n_features=int(model.n_features_in_),
+        model_version=model_version,
+    )
+
+
+def check_parity(forest: FlatForest, model, X) -> float:
+    """
+    Compare the flat evaluator with `model.predict` on `X` and return the largest
+    absolute difference. Raises ValueError if they disagree beyond tolerance.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    expected = model.predict(X)
+    actual = forest.predict(X)
+    if not np.allclose(actual, expected, rtol=PARITY_RTOL, atol=PARITY_ATOL):
+        raise ValueError("Flattened forest does not match the model's predictions.")
+    return float(np.max(np.abs(actual - expected))) if len(X) else 0.0
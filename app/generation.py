@@ -0,0 +1,35 @@
+# generation.py
+
+import os
+import uuid
+from typing import Optional
+
+# Shared by every process serving this app on the host (workers, training)
+GENERATION_DIR = os.getenv("GENERATION_DIR", "cache_generations")
+
+
+class Generation:
+    """
+    Cross-process change marker for one in-memory cache. The process that
+    changes the underlying data calls `bump()`; every process compares `read()`
+    with the value its cache was built under and rebuilds when they differ.
+    """
+
+    def __init__(self, name: str, directory: str = GENERATION_DIR):
+        self.path = os.path.join(directory, f"{name}.generation")
+
+    def read(self) -> Optional[str]:
+        try:
+            with open(self.path) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def bump(self):
+        # A fresh random token, swapped in atomically so readers never see it half-written
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        token = uuid.uuid4().hex
+        tmp_path = f"{self.path}.{token}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(token)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,186 @@
+# image_pipeline.py
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+
+from app.image_store import put_staged, write_atomic
+
+# Upload limits: bytes per file, bytes per request (checked before the multipart
+# body is parsed), and decoded pixels per image (decompression bombs)
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_REQUEST_BYTES = 100 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Published derivatives: longest side in px (None keeps full resolution)
+IMAGE_VARIANTS = {"thumb": 320, "medium": 1024, "original": None}
+DERIVATIVE_FORMAT = "WEBP"  # or "JPEG"
+DERIVATIVE_QUALITY = {"thumb": 75, "medium": 80, "original": 90}
+FORMAT_EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg"}
+# Largest side each encoder can write; "original" is scaled down to fit
+FORMAT_MAX_SIDE = {"WEBP": 16383, "JPEG": 65535}
+
+# Hex digits of the content hash embedded in published filenames
+FILENAME_HASH_LENGTH = 16
+
+# Pillow releases the GIL while decoding and compressing, so a small thread
+# pool gives real per-image parallelism without copying bytes between processes
+IMAGE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class ImageTooLarge(Exception):
+    """Raised when an upload exceeds the byte or pixel limits."""
+
+
+async def save_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """
+    Copy an upload to a temporary file in chunks and return its path. Raises
+    413 once more than `max_bytes` have been read; the caller removes the file.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload-")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{upload.filename} is larger than {max_bytes // (1024 * 1024)} MB",
+                    )
+                await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _open_image(path: str) -> Image.Image:
+    # Only the header is read here; the size check runs before any pixel is decoded.
+    # MAX_IMAGE_PIXELS is enforced here rather than through the process-wide
+    # Image.MAX_IMAGE_PIXELS, whose default still rejects larger bombs in open()
+    try:
+        img = Image.open(path)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    if img.width * img.height > MAX_IMAGE_PIXELS:
+        img.close()
+        raise ImageTooLarge(f"{img.width}x{img.height} exceeds {MAX_IMAGE_PIXELS} pixels")
+    return img
+
+
+def stage_image(path: str) -> Optional[str]:
+    """
+    Decode an image file, normalize it to an RGBA PNG in the staging store and
+    return its content hash, or None if it is not a readable image. Raises
+    ImageTooLarge for decompression-bomb sized images.
+    """
+    try:
+        img = _open_image(path)
+    except ImageTooLarge:
+        raise
+    except Exception:
+        return None  # skip if image is not readable
+
+    try:
+        with img:
+            rgba = img.convert("RGBA")
+    except Exception:
+        return None
+
+    buffer = BytesIO()
+    rgba.save(buffer, format="PNG")
+    return put_staged(buffer.getvalue())
+
+
+def make_derivatives(source: Union[str, BytesIO], dest_dir: str, stem: str) -> Dict[str, str]:
+    """
+    Write every IMAGE_VARIANTS size of an image to `dest_dir` as
+    `{stem}_{variant}.{content hash}{ext}` in DERIVATIVE_FORMAT, and return the
+    filenames by variant. Images are only ever scaled down. Each file is
+    renamed into place once complete; on failure the ones written are removed.
+    """
+    extension = FORMAT_EXTENSIONS[DERIVATIVE_FORMAT]
+    format_max_side = FORMAT_MAX_SIDE[DERIVATIVE_FORMAT]
+    with Image.open(source) as img:
+        img.load()
+        # JPEG has no alpha channel
+        base = img.convert("RGBA" if DERIVATIVE_FORMAT == "WEBP" else "RGB")
+
+    filenames = {}
+    try:
+        for variant, max_side in IMAGE_VARIANTS.items():
+            resized = base
+            max_side = min(max_side or format_max_side, format_max_side)
+            if max(base.size) > max_side:
+                resized = base.copy()
+                resized.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+            options = {"quality": DERIVATIVE_QUALITY[variant]}
+            if DERIVATIVE_FORMAT == "WEBP":
+                options["method"] = 4
+            else:
+                options["optimize"] = True
+
+            buffer = BytesIO()
+            resized.save(buffer, format=DERIVATIVE_FORMAT, **options)
+            data = buffer.getvalue()
+
+            # The name changes whenever the bytes do, so it can be cached forever
+            digest = hashlib.sha256(data).hexdigest()[:FILENAME_HASH_LENGTH]
+            filename = f"{stem}_{variant}.{digest}{extension}"
+            write_atomic(os.path.join(dest_dir, filename), data)
+            filenames[variant] = filename
+    except BaseException:
+        remove_files(os.path.join(dest_dir, filename) for filename in filenames.values())
+        raise
+    return filenames
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+        return _executor
+
+
+def submit_image_task(fn, *args):
+    """Submit a CPU-bound image function to the bounded image pool from sync code."""
+    return _get_executor().submit(fn, *args)
+
+
+async def run_image_task(fn, *args):
+    """Run a CPU-bound image function on the bounded image pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+def shutdown_image_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,133 @@
+# image_store.py
+
+import fcntl
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import inspect, text
+from sqlmodel import select
+
+from app.models import TempLandImage
+
+# Staged (not yet published) images, stored once per content hash
+STAGING_DIR = "staged_images"
+STAGED_EXTENSION = ".png"
+STAGING_LOCK_PATH = os.path.join(STAGING_DIR, ".lock")
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_image_hash(value: str) -> bool:
+    return bool(_HASH_PATTERN.match(value))
+
+
+def staged_path(image_hash: str) -> str:
+    return os.path.join(STAGING_DIR, f"{image_hash}{STAGED_EXTENSION}")
+
+
+def write_atomic(path: str, data: bytes):
+    """Write `data` to a temp file beside `path` and rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def put_staged(data: bytes) -> str:
+    """Store encoded image bytes under their sha256 and return the hash."""
+    image_hash = hashlib.sha256(data).hexdigest()
+    path = staged_path(image_hash)
+    if os.path.exists(path):
+        return image_hash  # same content already staged
+
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    write_atomic(path, data)
+    return image_hash
+
+
+_staging_lock_state = threading.local()
+
+
+@contextmanager
+def staging_lock():
+    """
+    Exclusive lock over the staging store, across threads and processes (and
+    re-entrant within a thread). `discard_staged` holds it from its reference
+    check to the removal; hold it from checking that staged files exist until
+    the rows referring to them are committed, so neither can interleave.
+    """
+    if getattr(_staging_lock_state, "held", False):
+        yield
+        return
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    with open(STAGING_LOCK_PATH, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        _staging_lock_state.held = True
+        try:
+            yield
+        finally:
+            _staging_lock_state.held = False
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def discard_staged(session, image_hashes):
+    """
+    Remove staged files no longer referenced by any TempLandImage. Call after
+    the rows referring to them have been deleted and committed.
+    """
+    image_hashes = {image_hash for image_hash in image_hashes if image_hash}
+    if not image_hashes:
+        return
+    with staging_lock():
+        still_used = set(session.exec(
+            select(TempLandImage.imageHash).where(TempLandImage.imageHash.in_(image_hashes))
+        ).all())
+        for image_hash in image_hashes - still_used:
+            try:
+                os.remove(staged_path(image_hash))
+            except FileNotFoundError:
+                pass
+
+
+def ensure_image_store(engine):
+    """
+    Bring existing image tables up to date: add the derivative paths to
+    `landimage`, and the indexed `imageHash` column to `templandimage` with the
+    legacy `imageBase64` column made nullable.
+    """
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    with engine.begin() as conn:
+        land_image_columns = {col["name"] for col in inspect(conn).get_columns("landimage")}
+        for column in ("thumbPath", "mediumPath"):
+            if column not in land_image_columns:
+                conn.execute(text(f'ALTER TABLE landimage ADD COLUMN "{column}" VARCHAR'))
+
+        columns = {col["name"]: col for col in inspect(conn).get_columns("templandimage")}
+        if "imageHash" in columns and columns["imageBase64"]["nullable"]:
+            return
+
+        if conn.dialect.name != "sqlite":
+            if "imageHash" not in columns:
+                conn.execute(text('ALTER TABLE templandimage ADD COLUMN "imageHash" VARCHAR'))
+            conn.execute(text('ALTER TABLE templandimage ALTER COLUMN "imageBase64" DROP NOT NULL'))
+            for index in TempLandImage.__table__.indexes:
+                index.create(conn, checkfirst=True)
+            return
+
+        # SQLite cannot relax NOT NULL in place; rebuild the (small) staging table
+        conn.execute(text("ALTER TABLE templandimage RENAME TO templandimage_old"))
+        TempLandImage.__table__.create(conn)
+        conn.execute(text(
+            'INSERT INTO templandimage (id, "tempLandId", "imageBase64") '
+            'SELECT id, "tempLandId", "imageBase64" FROM templandimage_old'
+        ))
+        conn.execute(text("DROP TABLE templandimage_old"))
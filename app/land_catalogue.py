@@ -0,0 +1,110 @@
+# land_catalogue.py
+
+import bisect
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from app.db import get_session
+from app.generation import Generation
+from app.models import Land
+
+
+@dataclass(frozen=True)
+class CatalogueSnapshot:
+    # Hash of the serialized catalogue, so equal data gives an equal version
+    # across restarts and worker processes
+    version: str
+    ids: List[int]  # ascending
+    lands: Dict[int, dict]  # serialized with host-relative image URLs
+    generation: Optional[str] = None  # cross-process stamp it was built under
+
+    def page(self, cursor: Optional[int], limit: Optional[int]) -> Tuple[List[dict], Optional[int]]:
+        """
+        Lands after `cursor` in id order (all of them with `limit=None`), and the
+        next cursor (None on the last page).
+        """
+        start = 0 if cursor is None else bisect.bisect_right(self.ids, cursor)
+        end = len(self.ids) if limit is None else start + limit
+        page_ids = self.ids[start:end]
+        next_cursor = page_ids[-1] if end < len(self.ids) else None
+        return [self.lands[land_id] for land_id in page_ids], next_cursor
+
+
+class LandCatalogue:
+    """
+    Process-wide snapshot of every published Land, serialized once. It is
+    built lazily and rebuilt on the next access after `invalidate()`, which the
+    publish and delete paths call after committing. The invalidation is also
+    stamped on disk, so every worker process rebuilds, not just the writer;
+    the stamp is read at most once per `check_interval` seconds.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self._snapshot: Optional[CatalogueSnapshot] = None
+        self.check_interval = check_interval
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._generation = Generation("land_catalogue")
+
+    def get(self, serialize: Callable[[Land], dict], session=None) -> CatalogueSnapshot:
+        """
+        The current snapshot. `serialize` turns a Land (with images loaded) into
+        its API dict with host-relative image URLs; it is only used on rebuild.
+        """
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != self._generation.read():
+                if session is None:
+                    with get_session() as own_session:
+                        snapshot = self._build(own_session, serialize)
+                else:
+                    snapshot = self._build(session, serialize)
+                self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def current(self) -> Optional[CatalogueSnapshot]:
+        """
+        The built snapshot if it was checked against the on-disk generation
+        within `check_interval`, else None. Never touches the disk, so it is
+        safe on the event loop; on None, call `get()` (off the loop).
+        """
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._checked_at >= self.check_interval:
+            return None
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+        self._generation.bump()
+
+    def _build(self, session, serialize) -> CatalogueSnapshot:
+        # Read before querying, so a change committed mid-build still triggers a rebuild
+        generation = self._generation.read()
+        lands = session.exec(
+            select(Land).options(selectinload(Land.images)).order_by(Land.id)
+        ).all()
+        serialized = [serialize(land) for land in lands]
+
+        digest = hashlib.sha256(json.dumps(serialized, sort_keys=True).encode())
+        return CatalogueSnapshot(
+            version=digest.hexdigest()[:32],
+            ids=[land["id"] for land in serialized],
+            lands={land["id"]: land for land in serialized},
+            generation=generation,
+        )
+
+
+land_catalogue = LandCatalogue()
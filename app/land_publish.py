@@ -0,0 +1,157 @@
+# land_publish.py
+
+import base64
+import os
+import uuid
+from concurrent.futures import wait
+from io import BytesIO
+from typing import Dict, List
+
+from sqlalchemy import delete
+from sqlmodel import select
+from sqlalchemy.orm import selectinload
+
+from app.image_pipeline import make_derivatives, remove_files, submit_image_task
+from app.image_store import discard_staged, staged_path
+from app.land_catalogue import land_catalogue
+from app.land_search import extract_province
+from app.landmark_distances import refresh_land_distances
+from app.models import Land, LandImage, TempLand, TempLandImage
+
+UPLOAD_DIR = "uploaded_files"
+
+
+class PublishError(Exception):
+    """Raised when a TempLand cannot be published; nothing is kept."""
+
+
+class TempLandNotFound(Exception):
+    """Raised when some of the TempLands to publish do not exist (or no longer do)."""
+
+    def __init__(self, temp_land_ids: List[int]):
+        super().__init__(temp_land_ids)
+        self.temp_land_ids = temp_land_ids
+
+
+def _image_source(temp_img):
+    if temp_img.imageHash:
+        return staged_path(temp_img.imageHash)
+    # Legacy rows hold the PNG bytes as base64
+    return BytesIO(base64.b64decode(temp_img.imageBase64))
+
+
+def _missing_temp_lands(session, temp_land_ids: List[int], lock: bool = False) -> List[int]:
+    statement = select(TempLand.id).where(TempLand.id.in_(temp_land_ids))
+    if lock:
+        statement = statement.with_for_update()
+    present = set(session.exec(statement).all())
+    return [temp_land_id for temp_land_id in temp_land_ids if temp_land_id not in present]
+
+
+def publish_temp_lands(session, temp_land_ids: List[int]) -> Dict[int, int]:
+    """
+    Publish TempLands as Lands and return {temp_land_id: land_id}. Image
+    derivatives for all of them are generated in parallel on the image pool
+    before any row is written, so the write transaction only covers the row
+    changes. If anything fails the transaction is rolled back, the files
+    written so far are removed and the error is raised; the TempLands stay in
+    review. Raises TempLandNotFound if any TempLand does not exist, including
+    one published or rejected concurrently.
+    """
+    temp_land_ids = list(dict.fromkeys(temp_land_ids))
+    temp_lands = session.exec(
+        select(TempLand)
+        .where(TempLand.id.in_(temp_land_ids))
+        .options(selectinload(TempLand.images))
+    ).all()
+    found = {temp_land.id: temp_land for temp_land in temp_lands}
+    missing = [temp_land_id for temp_land_id in temp_land_ids if temp_land_id not in found]
+    if missing:
+        raise TempLandNotFound(missing)
+
+    new_lands = {}
+    image_hashes = []
+    jobs = []
+    # Names unique to this attempt: a concurrent publish of the same TempLand
+    # must never write (and on losing, remove) the files the winner points to
+    attempt = uuid.uuid4().hex[:8]
+    try:
+        for temp_land_id in temp_land_ids:
+            temp_land = found[temp_land_id]
+            new_lands[temp_land_id] = Land(
+                landName=temp_land.landName,
+                description=temp_land.description,
+                area=temp_land.area,
+                price=temp_land.price,
+                address=temp_land.address,
+                province=extract_province(temp_land.address),
+                latitude=temp_land.latitude,
+                longitude=temp_land.longitude,
+                zoning=temp_land.zoning,
+                popDensity=temp_land.popDensity,
+                floodRisk=temp_land.floodRisk,
+                nearbyDevPlan=temp_land.nearbyDevPlan,
+                uploadedAt=temp_land.uploadedAt,
+            )
+            # 🚀 Derivatives for every image of every land, in parallel (land ids
+            # don't exist yet, so the stem uses the temp land and the attempt)
+            for i, temp_img in enumerate(temp_land.images):
+                image_hashes.append(temp_img.imageHash)
+                job = submit_image_task(
+                    make_derivatives, _image_source(temp_img), UPLOAD_DIR, f"temp_{temp_land_id}_{attempt}_{i + 1}"
+                )
+                jobs.append((temp_land_id, i, job))
+        # End the read transaction; nothing is held while the images are processed
+        session.rollback()
+
+        wait([job for _, _, job in jobs])
+        failures = [
+            f"temp land {temp_land_id} image {i + 1}: {job.exception()}"
+            for temp_land_id, i, job in jobs
+            if job.exception() is not None
+        ]
+        if failures:
+            # A staged source vanishes when a concurrent publish/reject won
+            missing = _missing_temp_lands(session, temp_land_ids)
+            if missing:
+                raise TempLandNotFound(missing)
+            raise PublishError("Failed to process images: " + "; ".join(failures))
+
+        # ✅ Short write transaction: rows only
+        session.add_all(new_lands.values())
+        session.flush()  # assigns the land ids
+        for temp_land_id, _, job in jobs:
+            paths = {variant: f"/{UPLOAD_DIR}/{filename}" for variant, filename in job.result().items()}
+            session.add(LandImage(
+                landId=new_lands[temp_land_id].id,
+                imagePath=paths["original"],
+                thumbPath=paths["thumb"],
+                mediumPath=paths["medium"],
+            ))
+
+        # Materialize nearest-landmark distances for the new lands
+        refresh_land_distances(session, land_ids=[land.id for land in new_lands.values()])
+
+        # Remove the reviewed entries. One that is gone by now was published or
+        # rejected while the images were processed. On SQLite the write lock
+        # taken by the inserts above keeps it that way until commit; elsewhere
+        # the row lock does.
+        missing = _missing_temp_lands(session, temp_land_ids, lock=True)
+        if missing:
+            raise TempLandNotFound(missing)
+        session.execute(delete(TempLandImage).where(TempLandImage.tempLandId.in_(temp_land_ids)))
+        session.execute(delete(TempLand).where(TempLand.id.in_(temp_land_ids)))
+
+        session.commit()
+    except BaseException:
+        session.rollback()
+        # Remove every file the image pool wrote for this publish
+        wait([job for _, _, job in jobs])
+        for _, _, job in jobs:
+            if not job.cancelled() and job.exception() is None:
+                remove_files(os.path.join(UPLOAD_DIR, filename) for filename in job.result().values())
+        raise
+
+    land_catalogue.invalidate()
+    discard_staged(session, image_hashes)
+    return {temp_land_id: land.id for temp_land_id, land in new_lands.items()}
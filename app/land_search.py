@@ -0,0 +1,267 @@
+# land_search.py
+
+import math
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, column, inspect, or_, select, table, text
+
+from app.models import Land
+
+# FTS5 index over Land (external content, so text is not stored twice). The
+# trigram tokenizer makes case-insensitive substring LIKEs index-backed, which
+# is exactly the matching the search endpoint has always done.
+land_fts = table(
+    "land_fts",
+    column("rowid"),
+    column("landName"),
+    column("description"),
+    column("province"),
+    column("rank"),
+)
+
+LAND_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS land_fts USING fts5(
+        landName, description, province,
+        content='land', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS land_fts_ai AFTER INSERT ON land BEGIN
+        INSERT INTO land_fts(rowid, landName, description, province)
+        VALUES (new.id, new.landName, new.description, new.province);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS land_fts_ad AFTER DELETE ON land BEGIN
+        INSERT INTO land_fts(land_fts, rowid, landName, description, province)
+        VALUES ('delete', old.id, old.landName, old.description, old.province);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS land_fts_au AFTER UPDATE ON land BEGIN
+        INSERT INTO land_fts(land_fts, rowid, landName, description, province)
+        VALUES ('delete', old.id, old.landName, old.description, old.province);
+        INSERT INTO land_fts(rowid, landName, description, province)
+        VALUES (new.id, new.landName, new.description, new.province);
+    END
+    """,
+]
+
+# R*Tree over Land coordinates (points stored as zero-size boxes)
+land_rtree = table(
+    "land_rtree",
+    column("id"),
+    column("min_lat"),
+    column("max_lat"),
+    column("min_lon"),
+    column("max_lon"),
+)
+
+LAND_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS land_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    """
+    CREATE TRIGGER IF NOT EXISTS land_rtree_ai AFTER INSERT ON land BEGIN
+        INSERT INTO land_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS land_rtree_ad AFTER DELETE ON land BEGIN
+        DELETE FROM land_rtree WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS land_rtree_au AFTER UPDATE OF latitude, longitude ON land BEGIN
+        INSERT OR REPLACE INTO land_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    """,
+]
+
+EARTH_RADIUS_KM = 6371
+
+# Trigram MATCH needs at least three characters per term
+MIN_MATCH_TERM_LENGTH = 3
+
+_LIKE_SPECIALS = re.compile(r"[%_\\]")
+
+
+def extract_province(address: str) -> str:
+    """The province part of an address: second-to-last comma part, else the last."""
+    address_parts = [part.strip() for part in address.split(",")]
+    return address_parts[-2] if len(address_parts) >= 2 else address_parts[-1]
+
+
+def uses_fts(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_land_search(engine):
+    """
+    Bring an existing database up to date: add and backfill the indexed
+    `province` column, then create the FTS and R*Tree indexes and their sync
+    triggers.
+    """
+    with engine.begin() as conn:
+        columns = {col["name"] for col in inspect(conn).get_columns("land")}
+        if "province" not in columns:
+            conn.execute(text("ALTER TABLE land ADD COLUMN province VARCHAR"))
+
+        land_table = Land.__table__
+        missing = conn.execute(
+            select(land_table.c.id, land_table.c.address).where(land_table.c.province.is_(None))
+        ).all()
+        if missing:
+            conn.execute(
+                land_table.update()
+                .where(land_table.c.id == bindparam("land_id"))
+                .values(province=bindparam("new_province")),
+                [{"land_id": land_id, "new_province": extract_province(address)} for land_id, address in missing],
+            )
+
+        # Indexes added to the model after the table was first created
+        for index in land_table.indexes:
+            index.create(conn, checkfirst=True)
+
+        if not uses_fts(conn):
+            return
+
+        existing = set(conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('land_fts', 'land_rtree')")
+        ).scalars())
+        for ddl in LAND_FTS_DDL + LAND_RTREE_DDL:
+            conn.execute(text(ddl))
+        if "land_fts" not in existing:
+            conn.execute(text("INSERT INTO land_fts(land_fts) VALUES ('rebuild')"))
+        if "land_rtree" not in existing:
+            conn.execute(text(
+                "INSERT INTO land_rtree SELECT id, latitude, latitude, longitude, longitude FROM land"
+            ))
+
+
+def _trigram_like(fts_column, land_column, value: str) -> Tuple[list, list]:
+    """
+    (land_fts conditions, Land conditions) for a case-insensitive substring match.
+    FTS5 only uses the trigram index for a plain LIKE (adding ESCAPE turns it into
+    a full scan), so LIKE wildcards in `value` split it into literal runs matched
+    through the index, and the exact escaped match is checked on Land.
+    """
+    runs = [run for run in _LIKE_SPECIALS.split(value) if run]
+    fts_conditions = [fts_column.like(f"%{run}%") for run in runs]
+    if runs == [value]:
+        return fts_conditions, []
+    return fts_conditions, [land_column.icontains(value, autoescape=True)]
+
+
+def search_filters(bind, province: Optional[str] = None, name: Optional[str] = None) -> list:
+    """
+    WHERE clauses on Land for the `province` / `name` parameters: case-insensitive
+    substring matches on the stored province and on landName.
+    """
+    if uses_fts(bind):
+        fts_conditions, filters = [], []
+        for fts_column, land_column, value in (
+            (land_fts.c.province, Land.province, province),
+            (land_fts.c.landName, Land.landName, name),
+        ):
+            if value:
+                fts_part, land_part = _trigram_like(fts_column, land_column, value)
+                fts_conditions += fts_part
+                filters += land_part
+        if fts_conditions:
+            filters.insert(0, Land.id.in_(select(land_fts.c.rowid).where(*fts_conditions)))
+        return filters
+
+    filters = []
+    if province:
+        filters.append(Land.province.icontains(province, autoescape=True))
+    if name:
+        filters.append(Land.landName.icontains(name, autoescape=True))
+    return filters
+
+
+def fulltext_search(bind, q: str) -> Tuple[Optional[object], List]:
+    """
+    Full-text search over landName and description. Returns (ranked, filters):
+    `ranked` is a subquery of (id, rank) to join and order by (None when no
+    term is long enough to use the index, or off SQLite); `filters` are extra
+    WHERE clauses for the remaining terms. All terms must match.
+    """
+    terms = q.split()
+    if uses_fts(bind):
+        long_terms = [term for term in terms if len(term) >= MIN_MATCH_TERM_LENGTH]
+        short_terms = [term for term in terms if len(term) < MIN_MATCH_TERM_LENGTH]
+    else:
+        long_terms, short_terms = [], terms
+
+    filters = [
+        or_(
+            Land.landName.icontains(term, autoescape=True),
+            Land.description.icontains(term, autoescape=True),
+        )
+        for term in short_terms
+    ]
+
+    if not long_terms:
+        return None, filters
+
+    phrases = " AND ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+    ranked = (
+        select(land_fts.c.rowid.label("id"), land_fts.c.rank.label("rank"))
+        .where(text("land_fts MATCH :fts_query").bindparams(fts_query=f"{{landName description}} : ({phrases})"))
+        .subquery()
+    )
+    return ranked, filters
+
+
+def bbox_filters(bind, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> list:
+    """
+    WHERE clauses on Land for points inside a lat/lon box. On SQLite the
+    candidates come from the R*Tree; the exact comparison on the real columns
+    then drops the few extra hits caused by its 32-bit float boxes.
+    """
+    filters = [
+        Land.latitude.between(min_lat, max_lat),
+        Land.longitude.between(min_lon, max_lon),
+    ]
+    if uses_fts(bind):
+        candidates = select(land_rtree.c.id).where(
+            land_rtree.c.max_lat >= min_lat,
+            land_rtree.c.min_lat <= max_lat,
+            land_rtree.c.max_lon >= min_lon,
+            land_rtree.c.min_lon <= max_lon,
+        )
+        filters.insert(0, Land.id.in_(candidates))
+    return filters
+
+
+def radius_bboxes(latitude: float, longitude: float, radius_km: float) -> List[Tuple[float, float, float, float]]:
+    """
+    (min_lat, max_lat, min_lon, max_lon) boxes that together enclose a radius
+    around a point: one box, or two when the circle crosses the antimeridian.
+    """
+    angular = radius_km / EARTH_RADIUS_KM  # radians
+    min_lat = max(-90.0, latitude - math.degrees(angular))
+    max_lat = min(90.0, latitude + math.degrees(angular))
+
+    # Widest longitude offset on the circle (not at its own latitude):
+    # asin(sin(d) / cos(lat)). A pole inside the circle reaches every longitude.
+    cos_lat = math.cos(math.radians(latitude))
+    if min_lat <= -90.0 or max_lat >= 90.0 or math.sin(angular) >= cos_lat:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    dlon = math.degrees(math.asin(math.sin(angular) / cos_lat))
+
+    min_lon, max_lon = longitude - dlon, longitude + dlon
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, min_lon + 360.0, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def radius_filters(bind, latitude: float, longitude: float, radius_km: float) -> list:
+    """WHERE clauses on Land for candidates within a radius (refine with haversine)."""
+    boxes = radius_bboxes(latitude, longitude, radius_km)
+    if len(boxes) == 1:
+        return bbox_filters(bind, *boxes[0])
+    return [or_(*(and_(*bbox_filters(bind, *box)) for box in boxes))]
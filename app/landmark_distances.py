@@ -0,0 +1,110 @@
+# landmark_distances.py
+
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert
+from sqlmodel import select
+
+from app.landmark_index import LandmarkSnapshot, landmark_index
+from app.models import Land, LandLandmarkDistance, Landmark, LandmarkType
+
+# Neighbours kept per land and type. Any overall top-k with k <= this is exact,
+# since it is contained in the union of the per-type top-k lists.
+TOP_K_PER_TYPE = 5
+
+
+def refresh_land_distances(
+    session,
+    land_ids: Optional[Iterable[int]] = None,
+    types: Optional[Iterable[str]] = None,
+    snapshot: Optional[LandmarkSnapshot] = None,
+) -> int:
+    """
+    Recompute the materialized rows for the given lands (default: all) and
+    landmark types (default: all) from the landmark index, or from `snapshot`
+    when given. The caller commits. Returns the number of rows written.
+    """
+    types = [landmark_type.value for landmark_type in LandmarkType] if types is None else list(types)
+    land_query = select(Land.id, Land.latitude, Land.longitude)
+    stale = delete(LandLandmarkDistance).where(LandLandmarkDistance.landmarkType.in_(types))
+    if land_ids is not None:
+        land_ids = list(land_ids)
+        land_query = land_query.where(Land.id.in_(land_ids))
+        stale = stale.where(LandLandmarkDistance.landId.in_(land_ids))
+
+    lands = session.execute(land_query).all()
+    session.execute(stale)
+    if not lands:
+        return 0
+
+    if snapshot is None:
+        snapshot = landmark_index.get(session)
+    latitudes = [land.latitude for land in lands]
+    longitudes = [land.longitude for land in lands]
+
+    rows = []
+    for landmark_type in types:
+        nearest = snapshot.k_nearest_of_type(landmark_type, latitudes, longitudes, TOP_K_PER_TYPE)
+        if nearest is None:
+            continue
+        distances, landmarks = nearest
+        for land, land_distances, land_landmarks in zip(lands, distances, landmarks):
+            rows.extend(
+                {
+                    "landId": land.id,
+                    "landmarkType": landmark_type,
+                    "rank": rank,
+                    "landmarkId": landmark.id,
+                    "distanceKm": float(distance),
+                }
+                for rank, (distance, landmark) in enumerate(zip(land_distances, land_landmarks), start=1)
+            )
+
+    if rows:
+        session.execute(insert(LandLandmarkDistance), rows)
+    return len(rows)
+
+
+def _ensure_land_distances(session, land_ids: List[int]):
+    # Lands published before this table existed are filled on first read
+    present = set(session.exec(
+        select(LandLandmarkDistance.landId)
+        .where(LandLandmarkDistance.landId.in_(land_ids))
+        .distinct()
+    ).all())
+    missing = [land_id for land_id in land_ids if land_id not in present]
+    if missing and refresh_land_distances(session, land_ids=missing):
+        session.commit()
+
+
+def nearest_distance_maps(session, land_ids: List[int]) -> Dict[int, dict]:
+    """
+    Nearest-landmark distance per LandmarkType for stored lands, in the same
+    shape as `compute_distance_map`. Types without landmarks map to 0.0.
+    """
+    _ensure_land_distances(session, land_ids)
+
+    dist_maps = {
+        land_id: {landmark_type.value: 0.0 for landmark_type in LandmarkType}
+        for land_id in land_ids
+    }
+    rows = session.exec(
+        select(LandLandmarkDistance)
+        .where(LandLandmarkDistance.landId.in_(land_ids), LandLandmarkDistance.rank == 1)
+    ).all()
+    for row in rows:
+        dist_maps[row.landId][row.landmarkType] = round(row.distanceKm, 4)
+    return dist_maps
+
+
+def closest_landmarks(session, land_id: int, k: int = TOP_K_PER_TYPE):
+    """The k closest landmarks of any type to a stored land, as (Landmark, distance_km)."""
+    _ensure_land_distances(session, [land_id])
+
+    return session.exec(
+        select(Landmark, LandLandmarkDistance.distanceKm)
+        .join(LandLandmarkDistance, LandLandmarkDistance.landmarkId == Landmark.id)
+        .where(LandLandmarkDistance.landId == land_id)
+        .order_by(LandLandmarkDistance.distanceKm, Landmark.id)
+        .limit(min(k, TOP_K_PER_TYPE))
+    ).all()
@@ -0,0 +1,176 @@
+# landmark_index.py
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sklearn.neighbors import BallTree
+from sqlmodel import select
+
+from app.db import get_session
+from app.generation import Generation
+from app.models import Landmark, LandmarkType
+
+EARTH_RADIUS_KM = 6371
+
+
+class LandmarkPoint(NamedTuple):
+    id: int
+    type: str
+    name: str
+    latitude: float
+    longitude: float
+
+
+@dataclass(frozen=True)
+class LandmarkSnapshot:
+    """
+    One immutable build of the index: a BallTree (haversine metric, radians)
+    per LandmarkType plus the landmarks it was built from.
+    """
+    version: int
+    trees: Dict[str, BallTree]
+    landmarks: Dict[str, List[LandmarkPoint]]
+    generation: Optional[str] = None  # cross-process stamp it was built under
+
+    def nearest_distances(self, latitudes, longitudes) -> Dict[str, Optional[np.ndarray]]:
+        """
+        Distance (km) from every point to the nearest landmark of each type.
+        Types with no landmarks map to None.
+        """
+        points = np.radians(np.column_stack([latitudes, longitudes]).astype(float))
+        result = {}
+        for landmark_type in LandmarkType:
+            tree = self.trees.get(landmark_type.value)
+            if tree is None:
+                result[landmark_type.value] = None
+                continue
+            dist, _ = tree.query(points, k=1)
+            result[landmark_type.value] = dist[:, 0] * EARTH_RADIUS_KM
+        return result
+
+    def k_nearest_of_type(self, landmark_type: str, latitudes, longitudes, k: int):
+        """
+        For every point, the k closest landmarks of one type as
+        (distances_km, landmarks) arrays of shape (points x k'), k' <= k.
+        Returns None when there are no landmarks of that type.
+        """
+        tree = self.trees.get(landmark_type)
+        if tree is None:
+            return None
+        landmarks = self.landmarks[landmark_type]
+        points = np.radians(np.column_stack([latitudes, longitudes]).astype(float))
+        dist, idx = tree.query(points, k=min(k, len(landmarks)))
+        return dist * EARTH_RADIUS_KM, [[landmarks[i] for i in row] for row in idx]
+
+    def k_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        types: Optional[Iterable[str]] = None,
+        max_km: Optional[float] = None,
+    ) -> List[Tuple[LandmarkPoint, float]]:
+        """
+        The k closest landmarks (optionally restricted to `types` and to
+        `max_km`) as (landmark, distance_km) pairs, closest first. Each type's
+        tree contributes at most k candidates, so the work is about
+        O(types * k log M) instead of a sort over every landmark.
+        """
+        point = np.radians([[latitude, longitude]])
+        candidates = []
+        for landmark_type in (types if types is not None else self.trees):
+            tree = self.trees.get(landmark_type)
+            if tree is None:
+                continue
+            landmarks = self.landmarks[landmark_type]
+            dist, idx = tree.query(point, k=min(k, len(landmarks)))
+            candidates.extend(
+                (float(d) * EARTH_RADIUS_KM, landmarks[i]) for d, i in zip(dist[0], idx[0])
+            )
+        if max_km is not None:
+            candidates = [c for c in candidates if c[0] <= max_km]
+        return [(lm, d) for d, lm in heapq.nsmallest(k, candidates, key=lambda c: c[0])]
+
+
+class LandmarkIndex:
+    """
+    Process-wide spatial index over the Landmark table. It is built lazily on
+    first use and rebuilt on the next access after `invalidate()`, which write
+    paths call whenever landmarks change (in any process: the invalidation is
+    stamped on disk, and checked at most every `check_interval` seconds). Readers keep the snapshot they got, so a rebuild never
+    exposes a half-built index.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self._snapshot: Optional[LandmarkSnapshot] = None
+        self._version = 0
+        self.check_interval = check_interval
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._generation = Generation("landmark_index")
+
+    def get(self, session=None) -> LandmarkSnapshot:
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != self._generation.read():
+                if session is None:
+                    with get_session() as own_session:
+                        snapshot = self._build(own_session)
+                else:
+                    snapshot = self._build(session)
+                self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def current(self) -> Optional[LandmarkSnapshot]:
+        """The snapshot if checked within `check_interval`, else None. No disk I/O."""
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._checked_at >= self.check_interval:
+            return None
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+        self._generation.bump()
+
+    def build(self, session) -> LandmarkSnapshot:
+        """
+        A snapshot of the landmarks visible to `session` (including its
+        uncommitted changes), without installing it as the shared one.
+        """
+        with self._lock:
+            return self._build(session)
+
+    def _build(self, session) -> LandmarkSnapshot:
+        # Read before querying, so a change committed mid-build still triggers a rebuild
+        generation = self._generation.read()
+        landmarks: Dict[str, List[LandmarkPoint]] = {}
+        for lm in session.exec(select(Landmark).order_by(Landmark.id)).all():
+            landmarks.setdefault(lm.type, []).append(
+                LandmarkPoint(lm.id, lm.type, lm.name, lm.latitude, lm.longitude)
+            )
+
+        trees = {
+            landmark_type: BallTree(
+                np.radians([[lm.latitude, lm.longitude] for lm in points]),
+                metric="haversine",
+            )
+            for landmark_type, points in landmarks.items()
+        }
+
+        self._version += 1
+        return LandmarkSnapshot(
+            version=self._version, trees=trees, landmarks=landmarks, generation=generation
+        )
+
+
+landmark_index = LandmarkIndex()
@@ -0,0 +1,93 @@
+# landmark_ingest.py
+
+import sys
+from pathlib import Path
+from typing import Union
+
+import pandas as pd
+from sqlalchemy import delete, func, insert, update
+from sqlmodel import select
+
+from app.landmark_distances import refresh_land_distances
+from app.landmark_index import landmark_index
+from app.models import LandLandmarkDistance, Landmark
+
+LANDMARKS_PATH = Path(__file__).resolve().parent / "data" / "landmarks.csv"
+
+
+def ingest_landmarks(session, source: Union[str, Path, pd.DataFrame] = LANDMARKS_PATH) -> dict:
+    """
+    Idempotently load landmarks (type, name, latitude, longitude) into the
+    Landmark table. Rows are matched on (type, name): new ones are inserted
+    and moved ones get their coordinates updated, each with one executemany.
+    Duplicates left behind by older, non-idempotent loads are removed first.
+    Stored land distances are refreshed for the landmark types that changed,
+    and everything commits in a single transaction. Returns the per-outcome
+    counts.
+    """
+    df = source if isinstance(source, pd.DataFrame) else pd.read_csv(source)
+    df = df[["type", "name", "latitude", "longitude"]].drop_duplicates(["type", "name"], keep="last")
+
+    # ✅ Collapse existing duplicates so the unique (type, name) index can be built
+    keep_ids = select(func.min(Landmark.id)).group_by(Landmark.type, Landmark.name)
+    # Distances pointing at a duplicate go first (foreign key); they are recomputed below
+    session.execute(
+        delete(LandLandmarkDistance).where(LandLandmarkDistance.landmarkId.not_in(keep_ids))
+    )
+    duplicates_removed = session.execute(
+        delete(Landmark).where(Landmark.id.not_in(keep_ids))
+    ).rowcount
+    for index in Landmark.__table__.indexes:
+        index.create(session.connection(), checkfirst=True)
+
+    existing = {
+        (lm_type, name): (lm_id, lat, lon)
+        for lm_id, lm_type, name, lat, lon in session.execute(
+            select(Landmark.id, Landmark.type, Landmark.name, Landmark.latitude, Landmark.longitude)
+        )
+    }
+
+    to_insert, to_update = [], []
+    for row in df.to_dict("records"):
+        current = existing.get((row["type"], row["name"]))
+        if current is None:
+            to_insert.append(row)
+        elif (current[1], current[2]) != (row["latitude"], row["longitude"]):
+            to_update.append({"id": current[0], "type": row["type"], "latitude": row["latitude"], "longitude": row["longitude"]})
+
+    if to_insert:
+        session.execute(insert(Landmark), to_insert)
+    if to_update:
+        session.execute(update(Landmark), to_update)
+
+    # ✅ Refresh stored land distances for the touched types, in the same transaction
+    if duplicates_removed:
+        changed_types = None  # removed rows may be referenced under any type
+    else:
+        changed_types = {row["type"] for row in to_insert} | {row["type"] for row in to_update}
+    changed = changed_types is None or bool(changed_types)
+    if changed:
+        # Built from this session, so it sees the uncommitted rows above
+        refresh_land_distances(session, types=changed_types, snapshot=landmark_index.build(session))
+    session.commit()
+
+    # ✅ Every process rebuilds its index only once the new rows are visible
+    if changed:
+        landmark_index.invalidate()
+
+    return {
+        "inserted": len(to_insert),
+        "updated": len(to_update),
+        "unchanged": len(df) - len(to_insert) - len(to_update),
+        "duplicates_removed": duplicates_removed,
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.landmark_ingest [path/to/landmarks.csv]
+    from app.db import create_db_and_tables, get_session
+
+    create_db_and_tables()
+    with get_session() as session:
+        counts = ingest_landmarks(session, sys.argv[1] if len(sys.argv) > 1 else LANDMARKS_PATH)
+    print(counts)
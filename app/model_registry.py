@@ -0,0 +1,259 @@
+# model_registry.py
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, List, Optional
+
+from app.forest import FlatForest
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent
+MODEL_PATH = ROOT_DIR / "model.pkl"
+FEATURE_PATH = ROOT_DIR / "features.json"
+FOREST_DIR = ROOT_DIR / "forest"  # one directory of .npy files per model version
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    An immutable (model, feature list) pair. Requests hold on to one bundle for
+    their whole lifetime, so a concurrent swap can never mix two artifacts.
+
+    Both artifacts are memory-mapped read-only, so worker processes share them
+    through the page cache. The sklearn model is only unpickled from
+    `model_raw` on first use of `model`; a worker that only scores through the
+    flat `forest` never holds its own copy.
+    """
+    features: List[str]
+    version: str
+    model_raw: Any  # read-only mmap of the exact model.pkl `version` was hashed from
+    forest: Optional[FlatForest] = None  # flat-array export of `model`, if published
+    loaded_at: float = field(default_factory=time.time)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def model(self) -> Any:
+        model = self.__dict__.get("_model")
+        if model is None:
+            with self._lock:
+                model = self.__dict__.get("_model")
+                if model is None:
+                    model = pickle.loads(self.model_raw)
+                    if isinstance(model, tuple):
+                        model = model[0]  # unpack if tuple
+                    object.__setattr__(self, "_model", model)
+        return model
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of the trained model and its feature list.
+
+    The artifact is mapped once and kept. `get()` notices when `model.pkl`
+    changes on disk (mtime/size, throttled to `check_interval` seconds) and
+    reloads it on a background thread while callers keep using the previous
+    bundle. Only the very first load blocks, since there is nothing to
+    serve before it.
+    """
+
+    def __init__(
+        self,
+        model_path: Path = MODEL_PATH,
+        feature_path: Path = FEATURE_PATH,
+        forest_dir: Path = FOREST_DIR,
+        check_interval: float = 1.0,
+    ):
+        self.model_path = Path(model_path)
+        self.feature_path = Path(feature_path)
+        self.forest_dir = Path(forest_dir)
+        self.check_interval = check_interval
+        self._bundle: Optional[ModelBundle] = None
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> ModelBundle:
+        bundle = self._bundle
+        if bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    self._refresh()
+                return self._bundle
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._file_signature() != self._signature:
+                self._schedule_reload()
+        return bundle
+
+    def reload(self) -> ModelBundle:
+        """Blocking reload, used by the writer right after publishing an artifact."""
+        with self._lock:
+            self._refresh()
+            return self._bundle
+
+    def publish(
+        self,
+        model: Any,
+        features: List[str],
+        reload: bool = True,
+        forest: Optional[FlatForest] = None,
+    ) -> str:
+        """
+        Atomically replace the on-disk artifact and return its version. Each
+        file is replaced atomically, but not the pair: features.json records the
+        sha256 of the model it belongs to, so `_refresh` can tell when it caught
+        a publish halfway and retry. A flat `forest` export of the model, when given, is saved alongside and
+        stamped with the version. With `reload=False` (e.g. from a training worker process)
+        the artifact is only written; serving processes pick it up on their
+        next check.
+        """
+        model_raw = pickle.dumps(model)
+        features_raw = json.dumps({
+            "model_sha256": hashlib.sha256(model_raw).hexdigest(),
+            "features": features,
+        }).encode("utf-8")
+        version = _artifact_version(model_raw, features_raw)
+        _atomic_write(self.feature_path, features_raw)
+        if forest is not None:
+            self._write_forest(replace(forest, model_version=version))
+        _atomic_write(self.model_path, model_raw)
+        self._prune_forests(keep=version)
+        if reload:
+            self.reload()
+        return version
+
+    @property
+    def version(self) -> Optional[str]:
+        bundle = self._bundle
+        return bundle.version if bundle else None
+
+    def _file_signature(self):
+        try:
+            stat = self.model_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _schedule_reload(self):
+        # Another thread is already reloading; keep serving the current bundle
+        if not self._lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self._background_reload, daemon=True).start()
+
+    def _background_reload(self):
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception("Model reload failed; keeping version %s", self.version)
+        finally:
+            self._lock.release()
+
+    def _refresh(self):
+        signature, model_raw, features_raw, features = self._read_artifact()
+
+        version = _artifact_version(model_raw, features_raw)
+        if self._bundle is not None and self._bundle.version == version:
+            self._signature = signature
+            return
+
+        bundle = ModelBundle(
+            features=features,
+            version=version,
+            model_raw=model_raw,
+            forest=self._load_forest(version),
+        )
+        if bundle.forest is None:
+            bundle.model  # nothing else to score with; unpickle now, not on a request
+        self._bundle = bundle
+        self._signature = signature
+        logger.info("Loaded model version %s", version)
+
+    def _read_artifact(self, attempts: int = 5):
+        # A publish replaces the two files one after the other; only accept a
+        # pair whose features.json names this exact model.pkl
+        for attempt in range(attempts):
+            signature = self._file_signature()
+            model_raw = _map_file(self.model_path)
+            features_raw = self.feature_path.read_bytes()
+            features, model_sha256 = _parse_features(features_raw)
+            if model_sha256 is None or model_sha256 == hashlib.sha256(model_raw).hexdigest():
+                return signature, model_raw, features_raw, features
+            model_raw.close()
+            time.sleep(0.05 * (attempt + 1))  # let the publish finish
+        raise ValueError(f"{self.feature_path.name} does not belong to {self.model_path.name}")
+
+    def _load_forest(self, version: str) -> Optional[FlatForest]:
+        # Only use an export made from exactly this model
+        try:
+            forest = FlatForest.load(self.forest_dir / version)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("Could not read forest export %s; using the model directly", version)
+            return None
+        return forest if forest.model_version == version else None
+
+    def _write_forest(self, forest: FlatForest):
+        # Versioned directories: processes still serving an older export keep their files
+        target = self.forest_dir / forest.model_version
+        if target.exists():
+            return  # same model published again
+        tmp_dir = self.forest_dir / f".{forest.model_version}.{uuid.uuid4().hex}.tmp"
+        forest.save(tmp_dir)
+        try:
+            os.replace(tmp_dir, target)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # a concurrent publish won the rename
+
+    def _prune_forests(self, keep: str):
+        # Mappings of removed files stay valid until the processes using them reload
+        if not self.forest_dir.exists():
+            return
+        for path in self.forest_dir.iterdir():
+            if path.name != keep and not path.name.startswith("."):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _artifact_version(model_raw, features_raw: bytes) -> str:
+    digest = hashlib.sha256(model_raw)
+    digest.update(features_raw)
+    return digest.hexdigest()[:12]
+
+
+def _parse_features(features_raw: bytes):
+    # (features, sha256 of the model they belong to); older artifacts are a bare list
+    data = json.loads(features_raw)
+    if isinstance(data, list):
+        return data, None
+    return data["features"], data["model_sha256"]
+
+
+def _map_file(path: Path) -> mmap.mmap:
+    # Keeps the contents it was opened with even after `_atomic_write` replaces the file
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _atomic_write(path: Path, data: bytes):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+model_registry = ModelRegistry()
@@ -1,5 +1,6 @@
 from typing import List, Optional
 from enum import Enum
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
@@ -12,12 +13,16 @@ class LandmarkType(str, Enum):
     Tourist = "Tourist"
 
 class Land(SQLModel, table=True):
+    # Covers bbox queries off SQLite, where there is no R*Tree
+    __table_args__ = (Index("ix_land_latitude_longitude", "latitude", "longitude"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     landName: str
     description: str
     area: float
     price: float
     address: str
+    province: Optional[str] = Field(default=None, index=True)  # extracted from address on write
     latitude: float
     longitude: float
     zoning: Optional[str]
@@ -32,6 +37,8 @@ class LandImage(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     landId: int = Field(foreign_key="land.id")
     imagePath: str  # relative path to file (can use as URL)
+    thumbPath: Optional[str] = None  # scaled-down derivatives (None for older uploads)
+    mediumPath: Optional[str] = None
 
     land: Optional[Land] = Relationship(back_populates="images")
 
@@ -57,14 +64,39 @@ class TempLand(SQLModel, table=True):
 class TempLandImage(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     tempLandId: int = Field(foreign_key="templand.id")
-    imageBase64: str  # Base64-encoded image string for preview
+    imageHash: Optional[str] = Field(default=None, index=True)  # sha256 of the staged file
+    imageBase64: Optional[str] = None  # legacy: base64 PNG stored inline
 
     # Backref to parent TempLand
     tempLand: Optional[TempLand] = Relationship(back_populates="images")
 
 class Landmark(SQLModel, table=True):
+    # (type, name) identifies a landmark; ingestion upserts coordinates on it
+    __table_args__ = (Index("ix_landmark_type_name", "type", "name", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     type: str  # could also use LandmarkType enum
     name: str
     latitude: float
     longitude: float
+
+class LandLandmarkDistance(SQLModel, table=True):
+    # Materialized k nearest landmarks of each type per land (rank 1 = nearest)
+    __table_args__ = (Index("ix_landlandmarkdistance_land_distance", "landId", "distanceKm"),)
+
+    landId: int = Field(foreign_key="land.id", primary_key=True)
+    landmarkType: str = Field(primary_key=True)
+    rank: int = Field(primary_key=True)
+    landmarkId: int = Field(foreign_key="landmark.id")
+    distanceKm: float
+
+class TrainingJob(SQLModel, table=True):
+    id: str = Field(primary_key=True)  # uuid4 hex
+    status: str  # queued | running | succeeded | failed
+    stage: Optional[str] = None
+    progress: float = 0.0
+    createdAt: str
+    startedAt: Optional[str] = None
+    finishedAt: Optional[str] = None
+    result: Optional[str] = None  # store as JSON string
+    error: Optional[str] = None
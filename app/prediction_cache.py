@@ -0,0 +1,81 @@
+# prediction_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+# Coordinates are rounded to this many decimals (about 11 cm) before keying
+# and before predicting, so a cached answer equals a freshly computed one
+COORDINATE_DECIMALS = 6
+# Same for the parcel size; float noise in it must not split cache entries
+LAND_SIZE_DECIMALS = 2
+
+PREDICTION_CACHE_SIZE = 10_000
+PREDICTION_CACHE_TTL = 3600.0  # seconds
+
+
+def quantize_coordinate(value: float) -> float:
+    return round(value, COORDINATE_DECIMALS)
+
+
+def quantize_land_size(value: float) -> float:
+    return round(value, LAND_SIZE_DECIMALS)
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL. Keys include the model and
+    landmark versions, so a new model or landmark set simply stops matching old
+    entries, which then age out.
+    """
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[tuple]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: tuple):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+prediction_cache = PredictionCache()
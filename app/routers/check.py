@@ -1,20 +1,21 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
 from sqlmodel import select
 from typing import List, Optional
 from sqlalchemy.orm import selectinload
-from pydantic import BaseModel
-from app.db import get_session
-from app.models import TempLand, TempLandImage, Land, LandImage
-from PIL import Image
-import base64
+from pydantic import BaseModel, Field
+from app.db import get_session, run_db
+from app.models import TempLand
+from app.image_store import discard_staged, is_image_hash, staged_path
+from app.land_publish import UPLOAD_DIR, PublishError, TempLandNotFound, publish_temp_lands
 import os
-from io import BytesIO
 
 router = APIRouter()
 
-UPLOAD_DIR = "uploaded_files"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+MAX_BULK_PUBLISH = 100
+
 # 🔽 Response model WITHOUT images for list
 class TempLandListOut(BaseModel):
     id: int
@@ -27,10 +28,11 @@ class TempLandListOut(BaseModel):
     class Config:
         orm_mode = True
 
-# 🔽 Response model WITH base64 images for detail view
+# 🔽 Response model WITH image URLs for detail view (base64 only for legacy rows)
 class TempLandImageOut(BaseModel):
     id: int
-    imageBase64: str
+    imageUrl: Optional[str] = None
+    imageBase64: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -54,93 +56,90 @@ class TempLandDetailOut(BaseModel):
     class Config:
         orm_mode = True
 
+class BulkPublishBody(BaseModel):
+    temp_land_ids: List[int] = Field(..., min_length=1, max_length=MAX_BULK_PUBLISH)
+
 # 🔽 GET all temp lands (no images)
 @router.get("/list", response_model=List[TempLandListOut])
-def get_temp_lands():
-    with get_session() as session:
-        temp_lands = session.exec(select(TempLand)).all()
-        return temp_lands
-
-# 🔽 GET one temp land (with base64 images)
-@router.get("/list/{id}", response_model=TempLandDetailOut)
-def get_temp_land_by_id(id: int):
-    with get_session() as session:
-        statement = (
-            select(TempLand)
-            .where(TempLand.id == id)
-            .options(selectinload(TempLand.images))  # ✅ eager-load relationship
-        )
-        temp_land = session.exec(statement).first()
+async def get_temp_lands():
+    return await run_db(_temp_lands)
 
-        if not temp_land:
-            raise HTTPException(status_code=404, detail="TempLand not found")
+def _temp_lands(session):
+    return session.exec(select(TempLand)).all()
 
-        return temp_land
+# 🔽 GET one temp land (with image URLs)
+@router.get("/list/{id}", response_model=TempLandDetailOut)
+async def get_temp_land_by_id(id: int, request: Request):
+    temp_land = await run_db(_temp_land_with_images, id)
+
+    if not temp_land:
+        raise HTTPException(status_code=404, detail="TempLand not found")
+
+    base_url = str(request.base_url).rstrip("/")
+
+    return {
+        **temp_land.model_dump(),
+        "images": [
+            {"id": img.id, "imageUrl": f"{base_url}/check/images/{img.imageHash}"}
+            if img.imageHash else
+            {"id": img.id, "imageBase64": img.imageBase64}
+            for img in temp_land.images
+        ],
+    }
+
+def _temp_land_with_images(session, id: int):
+    statement = (
+        select(TempLand)
+        .where(TempLand.id == id)
+        .options(selectinload(TempLand.images))  # ✅ eager-load relationship
+    )
+    return session.exec(statement).first()
+
+# 🔽 Stream a staged image by content hash
+@router.get("/images/{image_hash}")
+def get_staged_image(image_hash: str):
+    path = staged_path(image_hash) if is_image_hash(image_hash) else None
+
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    # Content-addressed, so the bytes behind this URL never change
+    return FileResponse(
+        path,
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
 
 @router.post("/publish/{temp_land_id}")
 def publish_temp_land(temp_land_id: int):
     with get_session() as session:
-        # Fetch TempLand with images
-        stmt = (
-            select(TempLand)
-            .where(TempLand.id == temp_land_id)
-            .options(selectinload(TempLand.images))
-        )
-        temp_land = session.exec(stmt).first()
-
-        if not temp_land:
+        try:
+            published = publish_temp_lands(session, [temp_land_id])
+        except TempLandNotFound:
             raise HTTPException(status_code=404, detail="TempLand not found")
+        except PublishError as e:
+            raise HTTPException(status_code=422, detail=str(e))
 
-        # Create real Land
-        new_land = Land(
-            landName=temp_land.landName,
-            description=temp_land.description,
-            area=temp_land.area,
-            price=temp_land.price,
-            address=temp_land.address,
-            latitude=temp_land.latitude,
-            longitude=temp_land.longitude,
-            zoning=temp_land.zoning,
-            popDensity=temp_land.popDensity,
-            floodRisk=temp_land.floodRisk,
-            nearbyDevPlan=temp_land.nearbyDevPlan,
-            uploadedAt=temp_land.uploadedAt,
-        )
-        session.add(new_land)
-        session.commit()
-        session.refresh(new_land)
-        land_id = new_land.id
-
-        # Decode and store each image
-        for i, temp_img in enumerate(temp_land.images):
-            try:
-                # Decode base64 and convert to PNG
-                img_bytes = base64.b64decode(temp_img.imageBase64)
-                image = Image.open(BytesIO(img_bytes)).convert("RGBA")
-
-                filename = f"land_{new_land.id}_{i + 1}.png"
-                filepath = os.path.join(UPLOAD_DIR, filename)
-                image.save(filepath, format="PNG")
-
-                # Store path
-                new_image = LandImage(
-                    landId=new_land.id,
-                    imagePath=f"/{UPLOAD_DIR}/{filename}"
-                )
-                session.add(new_image)
-            except Exception as e:
-                print(f"Failed to process image {i + 1}: {e}")
-                continue
-
-        session.commit()
+    return {"message": "Land published successfully", "land_id": published[temp_land_id]}
 
-        # Optional: clean up temp entries
-        for temp_img in temp_land.images:
-            session.delete(temp_img)
-        session.delete(temp_land)
-        session.commit()
-
-    return {"message": "Land published successfully", "land_id": land_id}
+# 🔽 Approve many TempLands at once (all or nothing)
+@router.post("/publish-bulk/")
+def publish_temp_lands_bulk(body: BulkPublishBody):
+    with get_session() as session:
+        try:
+            published = publish_temp_lands(session, body.temp_land_ids)
+        except TempLandNotFound as e:
+            raise HTTPException(status_code=404, detail=f"TempLand not found: {e.temp_land_ids}")
+        except PublishError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    return {
+        "message": f"{len(published)} lands published successfully",
+        "published": [
+            {"temp_land_id": temp_land_id, "land_id": land_id}
+            for temp_land_id, land_id in published.items()
+        ],
+    }
 
 @router.delete("/reject/{temp_land_id}")
 def reject_temp_land(temp_land_id: int):
@@ -156,6 +155,7 @@ def reject_temp_land(temp_land_id: int):
             raise HTTPException(status_code=404, detail="TempLand not found")
 
         # Delete associated images
+        image_hashes = [img.imageHash for img in temp_land.images]
         for img in temp_land.images:
             session.delete(img)
 
@@ -163,4 +163,7 @@ def reject_temp_land(temp_land_id: int):
         session.delete(temp_land)
         session.commit()
 
+        # ...and staged files no other upload shares
+        discard_staged(session, image_hashes)
+
     return {"message": f"TempLand {temp_land_id} has been rejected and deleted."}
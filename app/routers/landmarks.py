@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, Request
-from sqlmodel import select
-from app.models import Land, Landmark
-from app.db import get_session
-from app.utils import haversine
+from fastapi import APIRouter, HTTPException, Request, Query
+from typing import List, Optional
+from app.models import Land, LandmarkType
+from fastapi.concurrency import run_in_threadpool
+from app.db import get_session, run_db
+from app.landmark_distances import closest_landmarks
+from app.landmark_index import landmark_index
 
 router = APIRouter()
 
+MAX_K = 100
+
 @router.get("/closest-landmarks/{land_id}")
 def get_closest_landmarks(land_id: int):
     with get_session() as session:
@@ -14,27 +18,73 @@ def get_closest_landmarks(land_id: int):
         if not land:
             raise HTTPException(status_code=404, detail="Land not found")
 
-        landmarks = session.exec(select(Landmark)).all()
-
-        distances = []
-        for landmark in landmarks:
-            distance = haversine(
-                land.latitude, land.longitude,
-                landmark.latitude, landmark.longitude
-            )
-            distances.append({
+        # ✅ Single indexed lookup into the materialized distance table
+        closest = [
+            {
                 "id": landmark.id,
                 "type": landmark.type,
                 "name": landmark.name,
                 "latitude": landmark.latitude,
                 "longitude": landmark.longitude,
                 "distance_km": round(distance, 3)  # Round to 3 decimal places
-            })
+            }
+            for landmark, distance in closest_landmarks(session, land_id, k=5)
+        ]
+
+    return closest
+
+
+@router.get("/nearest")
+async def get_nearest_landmarks(
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    land_id: Optional[int] = Query(None),
+    k: int = Query(5, ge=1, le=MAX_K),
+    types: Optional[List[LandmarkType]] = Query(None),
+    max_km: Optional[float] = Query(None, gt=0),
+):
+    """
+    k nearest landmarks to a point, given either as `latitude`/`longitude` or as
+    a stored `land_id`, optionally filtered by `types` and capped at `max_km`.
+    """
+    has_point = latitude is not None and longitude is not None
+    if has_point == (land_id is not None) or (latitude is None) != (longitude is None):
+        raise HTTPException(status_code=400, detail="Provide either latitude and longitude, or land_id")
+
+    if land_id is not None:
+        land = await run_db(_get_land, land_id)
+
+        if not land:
+            raise HTTPException(status_code=404, detail="Land not found")
+
+        latitude, longitude = land.latitude, land.longitude
+
+    # Rebuilding after an ingest queries every landmark; keep it off the event loop
+    snapshot = landmark_index.current()
+    if snapshot is None:
+        snapshot = await run_in_threadpool(landmark_index.get)
+
+    # ✅ Per-type k-NN from the spatial index, merged with a bounded heap
+    nearest = snapshot.k_nearest(
+        latitude,
+        longitude,
+        k,
+        types=[landmark_type.value for landmark_type in types] if types else None,
+        max_km=max_km,
+    )
 
-        # Sort by distance
-        distances.sort(key=lambda x: x["distance_km"])
+    return [
+        {
+            "id": landmark.id,
+            "type": landmark.type,
+            "name": landmark.name,
+            "latitude": landmark.latitude,
+            "longitude": landmark.longitude,
+            "distance_km": round(distance, 3)  # Round to 3 decimal places
+        }
+        for landmark, distance in nearest
+    ]
 
-        # Take top 5
-        closest = distances[:5]
 
-        return closest
\ No newline at end of file
+def _get_land(session, land_id: int):
+    return session.get(Land, land_id)
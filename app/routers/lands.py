@@ -1,12 +1,30 @@
-from fastapi import APIRouter, Request, Query
-from app.db import get_session
-from typing import List, Optional
-from app.models import Land, LandImage
+from fastapi import APIRouter, HTTPException, Request, Response, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from app.db import run_db
+from typing import List, Optional, Sequence
+from app.models import Land, LandImage, LandLandmarkDistance
+from app.land_catalogue import land_catalogue
+from app.land_search import bbox_filters, fulltext_search, radius_filters, search_filters
+from app.utils import haversine
 from sqlmodel import select
+from sqlalchemy import delete
 from pydantic import BaseModel
+import hashlib
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_RADIUS_KM = 500
+PAGE_SIZE_HELP = f"Page size (default {DEFAULT_PAGE_SIZE} when paging); omit with no cursor for every match"
+
+class LandImageVariants(BaseModel):
+    thumb: str
+    medium: str
+    original: str
+
+
 class LandReadWithImages(BaseModel):
     id: int
     landName: str
@@ -22,169 +40,388 @@ class LandReadWithImages(BaseModel):
     nearbyDevPlan: str
     uploadedAt: str
     images: List[str]  # <<--- List of URLs
+    imageVariants: List[LandImageVariants]  # same images, per size
 
     class Config:
         orm_mode = True
 
 
-@router.get("/", response_model=List[LandReadWithImages])
-def get_lands(request: Request):
-    with get_session() as session:
-        lands = session.exec(select(Land)).all()
-
-        base_url = str(request.base_url).rstrip("/")
-
-        result = []
-        for land in lands:
-            # 🚀 Fetch LandImage objects
-            images = session.exec(
-                select(LandImage).where(LandImage.landId == land.id)
-            ).all()
-
-            # 🚀 Correctly use image.imagePath
-            image_paths = [
-                f"{base_url}{image.imagePath}" if image.imagePath.startswith("/") else f"{base_url}/{image.imagePath}"
-                for image in images
-            ]
-
-            result.append(LandReadWithImages(
-                id=land.id,
-                landName=land.landName,
-                description=land.description,
-                area=land.area,
-                price=land.price,
-                address=land.address,
-                latitude=land.latitude,
-                longitude=land.longitude,
-                zoning=land.zoning,
-                popDensity=land.popDensity,
-                floodRisk=land.floodRisk,
-                nearbyDevPlan=land.nearbyDevPlan,
-                uploadedAt=land.uploadedAt,
-                images=image_paths
-            ))
-
-        return result
-    
-from fastapi import HTTPException
-
-
-@router.get("/search", response_model=List[LandReadWithImages])
-def search_lands(
+# Same fields, all optional, for `fields=` projections (unrequested ones are omitted)
+class LandReadPartial(BaseModel):
+    id: int
+    landName: Optional[str] = None
+    description: Optional[str] = None
+    area: Optional[float] = None
+    price: Optional[float] = None
+    address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    zoning: Optional[str] = None
+    popDensity: Optional[float] = None
+    floodRisk: Optional[str] = None
+    nearbyDevPlan: Optional[str] = None
+    uploadedAt: Optional[str] = None
+    images: Optional[List[str]] = None
+    imageVariants: Optional[List[LandImageVariants]] = None
+
+
+class LandReadNearby(LandReadPartial):
+    distance_km: float
+
+
+LAND_FIELDS = list(LandReadWithImages.model_fields)
+IMAGE_FIELDS = {"images", "imageVariants"}
+
+
+def _image_url(base_url: str, image_path: str) -> str:
+    return f"{base_url}{image_path}" if image_path.startswith("/") else f"{base_url}/{image_path}"
+
+
+def _image_variants(base_url: str, image) -> dict:
+    # Images published before derivatives existed use the original for every size
+    original = _image_url(base_url, image.imagePath)
+    return {
+        "thumb": _image_url(base_url, image.thumbPath) if image.thumbPath else original,
+        "medium": _image_url(base_url, image.mediumPath) if image.mediumPath else original,
+        "original": original,
+    }
+
+
+def serialize_land(
+    land,
+    base_url: str,
+    fields: Sequence[str] = LAND_FIELDS,
+    images: Optional[List] = None,
+) -> dict:
+    """
+    Build the API shape for a Land (ORM object or projected row). Image rows
+    (with imagePath / thumbPath / mediumPath) come from `images` when given,
+    otherwise from the loaded `land.images`.
+    """
+    data = {field: getattr(land, field) for field in fields if field not in IMAGE_FIELDS}
+    if IMAGE_FIELDS.intersection(fields):
+        if images is None:
+            images = land.images
+        if "images" in fields:
+            data["images"] = [_image_url(base_url, image.imagePath) for image in images]
+        if "imageVariants" in fields:
+            data["imageVariants"] = [_image_variants(base_url, image) for image in images]
+    return data
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return LAND_FIELDS
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(LAND_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {sorted(unknown)}")
+
+    # id is always returned; it is the pagination cursor
+    return [field for field in LAND_FIELDS if field in requested or field == "id"]
+
+
+def _land_page(
+    session,
+    base_url: str,
+    fields: List[str],
+    where=(),
+    cursor=None,
+    limit: Optional[int] = DEFAULT_PAGE_SIZE,
+    ranked=None,
+    offset=0,
+):
+    """
+    One page of lands matching `where`, selecting only the requested columns.
+    By default this is a keyset page ordered by id after `cursor`; with a
+    `ranked` (id, rank) subquery it is ordered by rank and paged by `offset`.
+    `limit=None` returns every match. Returns (items, next) where `next` is the
+    next cursor or offset.
+    """
+    columns = [getattr(Land, field) for field in fields if field not in IMAGE_FIELDS]
+    statement = select(*columns).where(*where)
+    if ranked is not None:
+        statement = (
+            statement.join(ranked, ranked.c.id == Land.id)
+            .order_by(ranked.c.rank, Land.id)
+            .offset(offset)
+        )
+    else:
+        if cursor is not None:
+            statement = statement.where(Land.id > cursor)
+        statement = statement.order_by(Land.id)
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    rows = session.execute(statement).all()
+
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    if not has_more:
+        next_page = None
+    elif ranked is not None:
+        next_page = offset + limit
+    else:
+        next_page = rows[-1].id
+
+    # 🚀 Images for the whole page in one query
+    images = {}
+    if IMAGE_FIELDS.intersection(fields) and rows:
+        image_rows = session.execute(
+            select(LandImage.landId, LandImage.imagePath, LandImage.thumbPath, LandImage.mediumPath)
+            .where(LandImage.landId.in_([row.id for row in rows]))
+            .order_by(LandImage.id)
+        )
+        for image in image_rows:
+            images.setdefault(image.landId, []).append(image)
+
+    items = [serialize_land(row, base_url, fields, images.get(row.id, [])) for row in rows]
+    return items, next_page
+
+
+def _catalogue_land(land) -> dict:
+    # Host-relative image URLs; the request's base URL is prefixed per response
+    return serialize_land(land, "")
+
+
+def _with_base_url(item: dict, base_url: str, fields: Sequence[str] = LAND_FIELDS) -> dict:
+    data = {field: item[field] for field in fields}
+    if "images" in data:
+        data["images"] = [base_url + url for url in data["images"]]
+    if "imageVariants" in data:
+        data["imageVariants"] = [
+            {size: base_url + url for size, url in variant.items()} for variant in data["imageVariants"]
+        ]
+    return data
+
+
+def _catalogue_etag(version: str, base_url: str, *parts) -> str:
+    # Strong validator for one representation: catalogue version + host + query
+    key = "|".join([version, base_url, *(str(part) for part in parts)])
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+async def _catalogue_snapshot():
+    # Rebuilding after a publish/delete queries every land; keep it off the event loop
+    snapshot = land_catalogue.current()
+    if snapshot is None:
+        snapshot = await run_in_threadpool(land_catalogue.get, _catalogue_land)
+    return snapshot
+
+
+def _page_size(limit: Optional[int], *paging) -> Optional[int]:
+    # No paging parameters at all: every match, as before pagination existed
+    if limit is None and all(value is None for value in paging):
+        return None
+    return limit or DEFAULT_PAGE_SIZE
+
+
+def _cache_headers(etag: str) -> dict:
+    # Clients may keep the response but must revalidate; a match costs no DB work
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+@router.get("/", response_model=List[LandReadPartial], response_model_exclude_unset=True)
+async def get_lands(
+    request: Request,
+    cursor: Optional[int] = Query(None, description="Last id of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description=PAGE_SIZE_HELP),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields"),
+):
+    selected = _parse_fields(fields)
+    limit = _page_size(limit, cursor)
+
+    # 🚀 Served from the in-memory catalogue; no DB work until the next publish/delete
+    snapshot = await _catalogue_snapshot()
+    base_url = str(request.base_url).rstrip("/")
+    etag = _catalogue_etag(snapshot.version, base_url, cursor, limit, ",".join(selected))
+
+    page, next_cursor = snapshot.page(cursor, limit)
+    headers = _cache_headers(etag)
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    items = [_with_base_url(item, base_url, selected) for item in page]
+    return JSONResponse(content=items, headers=headers)
+
+
+@router.get("/search", response_model=List[LandReadPartial], response_model_exclude_unset=True)
+async def search_lands(
     request: Request,
+    response: Response,
     province: Optional[str] = Query(None),
     name: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, description="Full-text search over name and description, ranked"),
+    cursor: Optional[int] = Query(None, description="Last id of the previous page"),
+    offset: Optional[int] = Query(None, ge=0, description="Offset into ranked results (with q)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description=PAGE_SIZE_HELP),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields"),
 ):
-    with get_session() as session:
-        query = select(Land)
-        all_lands = session.exec(query).all()
-
-        filtered_lands = []
-
-        for land in all_lands:
-            matches_province = True
-            matches_name = True
-
-            # ✅ Province filter
-            if province:
-                address_parts = [part.strip() for part in land.address.split(",")]
-                province_text = address_parts[-2] if len(address_parts) >= 2 else address_parts[-1]
-                matches_province = province.lower() in province_text.lower()
-
-            # ✅ Land name filter
-            if name:
-                matches_name = name.lower() in land.landName.lower()
-
-            if matches_province and matches_name:
-                filtered_lands.append(land)
-
-        base_url = str(request.base_url).rstrip("/")
-        result = []
-        for land in filtered_lands:
-            images = session.exec(
-                select(LandImage).where(LandImage.landId == land.id)
-            ).all()
-
-            image_paths = [
-                f"{base_url}{image.imagePath}" if image.imagePath.startswith("/") else f"{base_url}/{image.imagePath}"
-                for image in images
-            ]
-
-            result.append(LandReadWithImages(
-                id=land.id,
-                landName=land.landName,
-                description=land.description,
-                area=land.area,
-                price=land.price,
-                address=land.address,
-                latitude=land.latitude,
-                longitude=land.longitude,
-                zoning=land.zoning,
-                popDensity=land.popDensity,
-                floodRisk=land.floodRisk,
-                nearbyDevPlan=land.nearbyDevPlan,
-                uploadedAt=land.uploadedAt,
-                images=image_paths
-            ))
-
-        return result
-    
+    selected = _parse_fields(fields)
+    limit = _page_size(limit, cursor, offset)
+    base_url = str(request.base_url).rstrip("/")
 
-@router.get("/{land_id}", response_model=LandReadWithImages)
-def get_land_by_id(land_id: int, request: Request):
-    with get_session() as session:
-        land = session.get(Land, land_id)
+    items, next_page, ranked = await run_db(
+        _search_page, base_url, selected, province, name, q, cursor, limit, offset or 0
+    )
 
-        if not land:
-            raise HTTPException(status_code=404, detail="Land not found")
+    if next_page is not None:
+        header = "X-Next-Offset" if ranked else "X-Next-Cursor"
+        response.headers[header] = str(next_page)
+    return items
 
-        images = session.exec(
-            select(LandImage).where(LandImage.landId == land.id)
-        ).all()
 
-        base_url = str(request.base_url).rstrip("/")
+def _search_page(session, base_url, selected, province, name, q, cursor, limit, offset):
+    bind = session.get_bind()
 
-        image_paths = [
-            f"{base_url}{image.imagePath}" if image.imagePath.startswith("/") else f"{base_url}/{image.imagePath}"
-            for image in images
-        ]
+    # ✅ Province / name filters run in SQL (FTS trigram index on SQLite)
+    where = search_filters(bind, province=province, name=name)
+
+    # ✅ Ranked full-text search
+    ranked = None
+    if q and q.strip():
+        ranked, extra_filters = fulltext_search(bind, q)
+        where += extra_filters
+
+    items, next_page = _land_page(
+        session, base_url, selected, where=where, cursor=cursor, limit=limit,
+        ranked=ranked, offset=offset,
+    )
+    return items, next_page, ranked is not None
+
+
+@router.get("/within-bbox", response_model=List[LandReadPartial], response_model_exclude_unset=True)
+async def get_lands_in_bbox(
+    request: Request,
+    response: Response,
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    cursor: Optional[int] = Query(None, description="Last id of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields"),
+):
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon must not exceed max_lat/max_lon")
+
+    selected = _parse_fields(fields)
+    base_url = str(request.base_url).rstrip("/")
+
+    items, next_cursor = await run_db(
+        _bbox_page, base_url, selected, min_lat, max_lat, min_lon, max_lon, cursor, limit
+    )
+
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return items
+
+
+def _bbox_page(session, base_url, selected, min_lat, max_lat, min_lon, max_lon, cursor, limit):
+    # ✅ Candidates from the spatial index, then an exact bounds check
+    where = bbox_filters(session.get_bind(), min_lat, max_lat, min_lon, max_lon)
+    return _land_page(session, base_url, selected, where=where, cursor=cursor, limit=limit)
+
+
+@router.get("/within-radius", response_model=List[LandReadNearby], response_model_exclude_unset=True)
+async def get_lands_in_radius(
+    request: Request,
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields"),
+):
+    """Lands within `radius_km` of a point, closest first."""
+    selected = _parse_fields(fields)
+    base_url = str(request.base_url).rstrip("/")
+
+    items, distances = await run_db(_radius_page, base_url, selected, latitude, longitude, radius_km, limit)
+
+    for item in items:
+        item["distance_km"] = round(distances[item["id"]], 3)
+    items.sort(key=lambda item: distances[item["id"]])
+    return items
+
+
+def _radius_page(session, base_url, selected, latitude, longitude, radius_km, limit):
+    # ✅ Candidates from the enclosing box, refined with haversine
+    where = radius_filters(session.get_bind(), latitude, longitude, radius_km)
+    candidates = session.execute(
+        select(Land.id, Land.latitude, Land.longitude).where(*where)
+    ).all()
+
+    nearby = sorted(
+        (distance, land_id)
+        for land_id, land_lat, land_lon in candidates
+        for distance in [haversine(latitude, longitude, land_lat, land_lon)]
+        if distance <= radius_km
+    )[:limit]
+    distances = {land_id: distance for distance, land_id in nearby}
+
+    items, _ = _land_page(
+        session, base_url, selected, where=(Land.id.in_(list(distances)),), limit=limit
+    )
+    return items, distances
 
-        return LandReadWithImages(
-            id=land.id,
-            landName=land.landName,
-            description=land.description,
-            area=land.area,
-            price=land.price,
-            address=land.address,
-            latitude=land.latitude,
-            longitude=land.longitude,
-            zoning=land.zoning,
-            popDensity=land.popDensity,
-            floodRisk=land.floodRisk,
-            nearbyDevPlan=land.nearbyDevPlan,
-            uploadedAt=land.uploadedAt,
-            images=image_paths
-        )
 
+@router.get("/{land_id}", response_model=LandReadWithImages)
+async def get_land_by_id(land_id: int, request: Request):
+    snapshot = await _catalogue_snapshot()
+    land = snapshot.lands.get(land_id)
+
+    if not land:
+        raise HTTPException(status_code=404, detail="Land not found")
+
+    base_url = str(request.base_url).rstrip("/")
+    etag = _catalogue_etag(snapshot.version, base_url, land_id)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+
+    return JSONResponse(content=_with_base_url(land, base_url), headers=_cache_headers(etag))
 
 
 @router.delete("/{land_id}")
-def delete_land(land_id: int):
-    with get_session() as session:
-        land = session.get(Land, land_id)
+async def delete_land(land_id: int):
+    if not await run_db(_delete_land, land_id):
+        raise HTTPException(status_code=404, detail="Land not found")
+
+    # Bumps the shared generation file; waits out any in-flight catalogue rebuild
+    await run_in_threadpool(land_catalogue.invalidate)
+
+    return {"detail": "Land and related images deleted successfully"}
+
+
+def _delete_land(session, land_id: int) -> bool:
+    land = session.get(Land, land_id)
 
-        if not land:
-            raise HTTPException(status_code=404, detail="Land not found")
+    if not land:
+        return False
 
-        # Delete related LandImage records first
-        images = session.exec(
-            select(LandImage).where(LandImage.landId == land.id)
-        ).all()
-        for image in images:
-            session.delete(image)
+    # Delete related LandImage records first
+    images = session.exec(
+        select(LandImage).where(LandImage.landId == land.id)
+    ).all()
+    for image in images:
+        session.delete(image)
 
-        # Now delete the Land record
-        session.delete(land)
-        session.commit()
+    # ...and its materialized landmark distances
+    session.execute(
+        delete(LandLandmarkDistance).where(LandLandmarkDistance.landId == land.id)
+    )
 
-        return {"detail": "Land and related images deleted successfully"}
\ No newline at end of file
+    # Now delete the Land record
+    session.delete(land)
+    session.commit()
+    return True
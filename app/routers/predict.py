@@ -1,18 +1,37 @@
 from fastapi import APIRouter
-from fastapi import HTTPException
-from pydantic import BaseModel
-import pandas as pd
-import pickle
-from pathlib import Path
+from fastapi import HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlmodel import select
 from app.db import get_session
-from app.utils import create_prediction_object
+from app.model_registry import model_registry
+from app.landmark_distances import nearest_distance_maps
+from app.landmark_index import landmark_index
+from app.prediction_cache import prediction_cache, quantize_coordinate, quantize_land_size
+from app.models import Land
+from app.utils import (
+    DEFAULT_HORIZON,
+    DEFAULT_INFLATION,
+    DEFAULT_INTEREST_RATE,
+    build_horizon_frame,
+    compute_distance_maps,
+    missing_horizon_features,
+    create_prediction_object,
+    create_prediction_objects,
+)
 from types import SimpleNamespace
 from fastapi import Query
 from typing import List
 import json
+import numpy as np
 
 router = APIRouter()
 
+MAX_HORIZON = 30
+MAX_BATCH_SIZE = 10000
+BATCH_CHUNK_SIZE = 500
+
 class LandBody(BaseModel):
     area: float
     latitude: float
@@ -33,63 +52,183 @@ class LandFeatures(BaseModel):
     inflation: float
     interest_rate: float
 
-@router.get("/predict-multi/", response_model=List[int])
-def predict_land_prices_multi(
-    latitude: float = Query(...),
-    longitude: float = Query(...),
-    land_size: float = Query(...),
-):
-    try:
-        root_dir = Path(__file__).resolve().parents[1]
-        model_path = root_dir / "model.pkl"
-        feature_path = root_dir / "features.json"
+class ParcelIn(BaseModel):
+    latitude: float
+    longitude: float
+    land_size: float
 
-        # ✅ Load model
-        with open(model_path, "rb") as f:
-            model = pickle.load(f)
-            if isinstance(model, tuple):
-                model = model[0]  # unpack if tuple
+class BatchPredictBody(BaseModel):
+    parcels: List[ParcelIn] = []
+    land_ids: List[int] = []
+    horizon: int = Field(DEFAULT_HORIZON, ge=1, le=MAX_HORIZON)
+    inflation: float = DEFAULT_INFLATION
+    interest_rate: float = DEFAULT_INTEREST_RATE
 
-        # ✅ Load expected features
-        with open(feature_path, "r") as f:
-            expected_cols = json.load(f)
+def _prediction_context():
+    return model_registry.get(), landmark_index.get()
 
-        # ✅ Fixed macroeconomic values
-        inflation = 1.5
-        interest_rate = 3.0
 
-        # ✅ Land input
-        land = SimpleNamespace(latitude=latitude, longitude=longitude, land_size=land_size)
+def _predict_horizon(bundle, latitude, longitude, land_size, horizon, inflation, interest_rate) -> List[int]:
+    # CPU-bound part of /predict-multi/: landmark distances, feature frame, forest
+    land = SimpleNamespace(latitude=latitude, longitude=longitude, land_size=land_size)
 
-        # ✅ Build features
-        with get_session() as session:
-            base_features = create_prediction_object(session, land)
+    # ✅ Build features
+    with get_session() as session:
+        base_features = create_prediction_object(session, land)
 
-        predictions = []
+    # ✅ One row per forecast year, scored in a single predict call
+    try:
+        input_df = build_horizon_frame(
+            [base_features], bundle.features, horizon, inflation, interest_rate
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Missing input features: {e.args[0]}")
 
-        for year in range(1, 6):
-            features_dict = base_features.model_dump()
-            features_dict.update({
-                "year": year,
-                "inflation": inflation,
-                "interest_rate": interest_rate
-            })
+    # 🚀 Flat-array forest when exported (same result, no sklearn per-call overhead)
+    if bundle.forest is not None:
+        raw_prices = bundle.forest.predict(input_df.to_numpy(dtype=np.float64))
+    else:
+        raw_prices = bundle.model.predict(input_df)
+    return [int(round(price)) for price in raw_prices]
 
-            input_df = pd.DataFrame([features_dict])
 
-            # Ensure the feature order and presence
-            missing_cols = [col for col in expected_cols if col not in input_df.columns]
-            if missing_cols:
-                raise HTTPException(status_code=400, detail=f"Missing input features: {missing_cols}")
+@router.get("/predict-multi/", response_model=List[int])
+async def predict_land_prices_multi(
+    response: Response,
+    latitude: float = Query(...),
+    longitude: float = Query(...),
+    land_size: float = Query(...),
+    horizon: int = Query(DEFAULT_HORIZON, ge=1, le=MAX_HORIZON),
+    inflation: float = Query(DEFAULT_INFLATION),
+    interest_rate: float = Query(DEFAULT_INTEREST_RATE),
+):
+    try:
+        # ✅ Cached model + expected features (reloaded in the background on change)
+        # and landmark set; both may touch the disk, so they load off the event loop
+        bundle, landmarks = await run_in_threadpool(_prediction_context)
+        response.headers["X-Model-Version"] = bundle.version
+
+        # 🚀 Same parcel + parameters + model + landmark set => cached answer
+        latitude, longitude = quantize_coordinate(latitude), quantize_coordinate(longitude)
+        land_size = quantize_land_size(land_size)
+        cache_key = (
+            latitude, longitude, land_size, horizon, inflation, interest_rate,
+            bundle.version, landmarks.version,
+        )
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            response.headers["X-Cache"] = "HIT"
+            return list(cached)
+        response.headers["X-Cache"] = "MISS"
+
+        predicted_prices = await run_in_threadpool(
+            _predict_horizon, bundle, latitude, longitude, land_size, horizon, inflation, interest_rate
+        )
+        prediction_cache.put(cache_key, tuple(predicted_prices))
+        return predicted_prices
+
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="model.pkl or features.json not found. Train the model first.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-            input_df = input_df[expected_cols]
+@router.post("/predict-batch/")
+def predict_land_prices_batch(body: BatchPredictBody):
+    """
+    Score many parcels in one request. Results are streamed back as NDJSON, one
+    line per parcel (in request order: `parcels` first, then `land_ids`), each
+    carrying the same `List[int]` horizon that `/predict-multi/` would return.
+    """
+    if not body.parcels and not body.land_ids:
+        raise HTTPException(status_code=400, detail="Provide at least one parcel or land id.")
+    if len(body.parcels) + len(body.land_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {MAX_BATCH_SIZE} parcels.")
 
-            predicted_price = model.predict(input_df)[0]
-            predictions.append(int(round(predicted_price)))
+    try:
+        bundle = model_registry.get()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="model.pkl or features.json not found. Train the model first.")
 
-        return predictions
+    # ✅ Fail before streaming starts; an error inside generate() would cut a 200 short
+    missing = missing_horizon_features(bundle.features)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing input features: {missing}")
 
+    # ✅ Resolve land ids up front; Land.area is the parcel size and the
+    # nearest-landmark distances come from the materialized table
+    items = [({"index": i}, parcel) for i, parcel in enumerate(body.parcels)]
+    if body.land_ids:
+        with get_session() as session:
+            lands = session.exec(select(Land).where(Land.id.in_(body.land_ids))).all()
+            stored = nearest_distance_maps(session, [land.id for land in lands]) if lands else {}
+            lands_by_id = {
+                land.id: SimpleNamespace(
+                    latitude=land.latitude,
+                    longitude=land.longitude,
+                    land_size=land.area,
+                    dist_map=stored[land.id],
+                )
+                for land in lands
+            }
+        items += [({"land_id": land_id}, lands_by_id.get(land_id)) for land_id in body.land_ids]
+
+    def generate():
+        for start in range(0, len(items), BATCH_CHUNK_SIZE):
+            chunk = items[start:start + BATCH_CHUNK_SIZE]
+            found = [parcel for _, parcel in chunk if parcel is not None]
+
+            predictions = []
+            if found:
+                dist_maps = [getattr(parcel, "dist_map", None) for parcel in found]
+                pending = [parcel for parcel, dist_map in zip(found, dist_maps) if dist_map is None]
+                with get_session() as session:
+                    computed = iter(compute_distance_maps(session, pending) if pending else [])
+                    dist_maps = [dist_map if dist_map is not None else next(computed) for dist_map in dist_maps]
+                    base_features = create_prediction_objects(session, found, dist_maps)
+                input_df = build_horizon_frame(
+                    base_features, bundle.features, body.horizon, body.inflation, body.interest_rate
+                )
+                predictions = bundle.model.predict(input_df).reshape(len(found), body.horizon)
+
+            rows = iter(predictions)
+            for key, parcel in chunk:
+                if parcel is None:
+                    line = {**key, "error": "Land not found"}
+                else:
+                    line = {
+                        **key,
+                        "latitude": parcel.latitude,
+                        "longitude": parcel.longitude,
+                        "land_size": parcel.land_size,
+                        "predictions": [int(round(price)) for price in next(rows)],
+                    }
+                yield json.dumps(line) + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": bundle.version},
+    )
+
+
+@router.get("/model-info")
+def get_model_info():
+    try:
+        bundle = model_registry.get()
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="model.pkl or features.json not found. Train the model first.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "version": bundle.version,
+        "loaded_at": bundle.loaded_at,
+        "features": bundle.features,
+        "flat_forest": bundle.forest is not None,
+    }
+
+
+@router.get("/cache-stats")
+async def get_prediction_cache_stats():
+    return prediction_cache.stats()
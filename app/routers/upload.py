@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Form, File, UploadFile
+from fastapi import APIRouter, Form, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import datetime
 from app.db import get_session
 from app.models import TempLand, TempLandImage
-import base64
+from app.image_store import discard_staged, staged_path, staging_lock
+from app.image_pipeline import ImageTooLarge, run_image_task, save_upload, stage_image
+import asyncio
 import json
-from PIL import Image
-from io import BytesIO
+import os
 
 
 router = APIRouter()
@@ -25,57 +27,85 @@ async def upload_temp_land(
     pop_density: float = Form(...),
     flood_risk: str = Form(...),
     nearby_dev_plan: List[str] = Form(...),
-    images: Optional[List[UploadFile]] = File(None)
+    images: Optional[List[UploadFile]] = File(None),
 ):
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
 
-    with get_session() as session:
-        new_temp_land = TempLand(
-            landName=land_name,
-            description=description,
-            area=area,
-            price=price,
-            address=address,
-            latitude=latitude,
-            longitude=longitude,
-            zoning=zoning,
-            popDensity=pop_density,
-            floodRisk=flood_risk,
-            nearbyDevPlan=json.dumps(nearby_dev_plan, ensure_ascii=False),
-            uploadedAt=timestamp,
+    new_temp_land = TempLand(
+        landName=land_name,
+        description=description,
+        area=area,
+        price=price,
+        address=address,
+        latitude=latitude,
+        longitude=longitude,
+        zoning=zoning,
+        popDensity=pop_density,
+        floodRisk=flood_risk,
+        nearbyDevPlan=json.dumps(nearby_dev_plan, ensure_ascii=False),
+        uploadedAt=timestamp,
+    )
+
+    # ✅ Stream uploads to disk in chunks (413 past the size limit)
+    paths = []
+    try:
+        for image in images or []:
+            paths.append(await save_upload(image))
+
+        # 🚀 Decode + PNG encode into the staging store in the image pool, one task per image
+        results = await asyncio.gather(
+            *(run_image_task(stage_image, path) for path in paths), return_exceptions=True
         )
-        session.add(new_temp_land)
-        session.commit()
-        session.refresh(new_temp_land)
 
-        temp_land_id = new_temp_land.id
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            # ✅ Don't orphan the images that did stage before one failed
+            staged = [result for result in results if isinstance(result, str)]
+            await run_in_threadpool(_discard_staged, staged)
+            if isinstance(errors[0], ImageTooLarge):
+                raise HTTPException(status_code=413, detail=f"Image too large: {errors[0]}")
+            raise errors[0]
+
+        # ✅ Blocking DB work runs in the threadpool, not on the event loop
+        temp_land_id = await run_in_threadpool(_save_temp_land, new_temp_land, list(zip(results, paths)))
+    finally:
+        for path in paths:
+            os.remove(path)
+
+    return {"message": "Temporary upload successful", "temp_land_id": temp_land_id}
+
 
-        if images:
-            for image in images:
-                # Read image bytes
-                original_bytes = await image.read()
+def _discard_staged(image_hashes):
+    with get_session() as session:
+        discard_staged(session, image_hashes)
 
-                # Open image with PIL
-                try:
-                    img = Image.open(BytesIO(original_bytes)).convert("RGBA")
-                except Exception:
-                    continue  # skip if image is not readable
 
-                # Convert to PNG in memory
-                buffer = BytesIO()
-                img.save(buffer, format="PNG")
-                buffer.seek(0)
-                png_bytes = buffer.read()
+def _save_temp_land(temp_land: TempLand, staged) -> int:
+    # `staged` pairs each image hash with its upload file; None hashes are
+    # images that were not readable, and are skipped
+    image_hashes = [image_hash for image_hash, _ in staged if image_hash is not None]
+    with staging_lock(), get_session() as session:
+        # A reject/publish sharing an image may have discarded the staged file
+        # before our rows existed; stage it again from the upload
+        for image_hash, path in staged:
+            if image_hash is not None and not os.path.exists(staged_path(image_hash)):
+                stage_image(path)
 
-                # Encode to base64
-                image_base64 = base64.b64encode(png_bytes).decode("utf-8")
+        try:
+            session.add(temp_land)
+            session.flush()  # assigns the id; everything commits together below
 
+            for image_hash in image_hashes:
                 temp_image = TempLandImage(
-                    tempLandId=temp_land_id,
-                    imageBase64=image_base64
+                    tempLandId=temp_land.id,
+                    imageHash=image_hash
                 )
                 session.add(temp_image)
 
-        session.commit()
-
-    return {"message": "Temporary upload successful", "temp_land_id": temp_land_id}
+            session.commit()
+        except BaseException:
+            session.rollback()
+            # ✅ Nothing references the files this upload staged
+            discard_staged(session, image_hashes)
+            raise
+        return temp_land.id
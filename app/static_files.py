@@ -0,0 +1,39 @@
+# static_files.py
+
+import os
+import re
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+from app.image_pipeline import FILENAME_HASH_LENGTH
+
+# `name.<hash>.ext` as written by make_derivatives
+_HASHED_NAME = re.compile(rf"\.([0-9a-f]{{{FILENAME_HASH_LENGTH}}})\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with HTTP caching. Content-hashed filenames are immutable and
+    use their hash as a strong ETag; other (legacy, reused) filenames may be
+    cached but must be revalidated, which answers 304 while unchanged.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+
+        match = _HASHED_NAME.search(os.fspath(full_path))
+        if match:
+            headers = {"etag": f'"{match.group(1)}"', "cache-control": IMMUTABLE_CACHE_CONTROL}
+        else:
+            headers = {"cache-control": REVALIDATE_CACHE_CONTROL}
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,335 @@
+# training.py
+
+import fcntl
+import json
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from sqlmodel import select
+
+from app.db import get_session
+from app.forest import check_parity, export_forest
+from app.landmark_index import landmark_index
+from app.landmark_ingest import ingest_landmarks
+from app.model_registry import model_registry
+from app.models import Landmark, TrainingJob
+from app.utils import haversine_nearest
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent
+DATA_DIR = ROOT_DIR / "data"
+LANDMARKS_PATH = DATA_DIR / "landmarks.csv"
+LAND_PATH = DATA_DIR / "land.csv"
+FINANCE_PATH = DATA_DIR / "land-finance.csv"
+# Held by the job that is training; shared by every gunicorn worker's executor
+TRAINING_LOCK_PATH = ROOT_DIR / ".training.lock"
+
+# Progress reported when each stage starts
+STAGE_PROGRESS = {
+    "landmarks": 0.05,
+    "load": 0.15,
+    "features": 0.25,
+    "persist": 0.35,
+    "train": 0.4,
+    "evaluate": 0.85,
+    "export": 0.9,
+    "publish": 0.95,
+}
+
+
+class TrainingError(Exception):
+    """Raised when the input data cannot be turned into a model."""
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def input_files_exist() -> bool:
+    return LANDMARKS_PATH.exists() and LAND_PATH.exists() and FINANCE_PATH.exists()
+
+
+def train_model(
+    persist: Optional[str] = None,
+    report: Callable[[str], None] = lambda stage: None,
+) -> dict:
+    """
+    Ingest landmarks, build the normalized training frame, fit the forest and
+    publish it. `report(stage)` is called as each stage starts. The artifact is
+    only written once training and evaluation have succeeded.
+    """
+    if not input_files_exist():
+        raise TrainingError("One or more input files are missing.")
+
+    timings = {}
+    stage = None
+    stage_start = time.perf_counter()
+
+    def begin(next_stage):
+        nonlocal stage, stage_start
+        now = time.perf_counter()
+        if stage is not None:
+            timings[stage] = round(now - stage_start, 4)
+        stage, stage_start = next_stage, now
+        if next_stage is not None:
+            report(next_stage)
+
+    with get_session() as session:
+        # ✅ Upsert landmarks (idempotent, so retraining does not grow the table)
+        begin("landmarks")
+        df_landmarks = pd.read_csv(LANDMARKS_PATH)
+        landmark_counts = ingest_landmarks(session, df_landmarks)
+
+        # ✅ Load land + finance data
+        begin("load")
+        df_land = pd.read_csv(LAND_PATH)
+        df_land["id"] = df_land.index + 1
+        df_finance = pd.read_csv(FINANCE_PATH)
+
+        df_all_landmarks = pd.read_sql(
+            select(Landmark.type, Landmark.latitude, Landmark.longitude),
+            session.connection(),
+        )
+
+    # ✅ Compute distances per land (all lands x same-type landmarks in one vectorized pass)
+    begin("features")
+    landmarks_by_type = dict(list(df_all_landmarks.groupby("type")))
+    dist_maps = {}
+    for ltype in df_landmarks["type"].unique():
+        same_type = landmarks_by_type.get(ltype)
+        if same_type is None:
+            dist_maps[f"dist_{ltype.lower()}"] = 0
+            continue
+        dist, _ = haversine_nearest(
+            df_land["latitude"], df_land["longitude"],
+            same_type["latitude"], same_type["longitude"],
+        )
+        dist_maps[f"dist_{ltype.lower()}"] = dist.round(4)
+
+    df_dist = pd.DataFrame(dist_maps, index=df_land.index)
+
+    # ✅ Attach land features (incl. distances) to every finance row by land id
+    df = df_finance.merge(pd.concat([df_land, df_dist], axis=1), left_on="land_id", right_on="id")
+
+    # ✅ Optionally persist the normalized frame; training works on it in memory
+    if persist:
+        begin("persist")
+        if persist == "parquet":
+            try:
+                df.to_parquet(ROOT_DIR / "normalized.parquet", index=False)
+            except ImportError:
+                raise TrainingError("Parquet output requires pyarrow or fastparquet.")
+        else:
+            df.to_csv(ROOT_DIR / "normalized.csv", index=False)
+
+    # ✅ Train model
+    begin("train")
+    if "land_price" not in df.columns:
+        raise TrainingError("Missing 'land_price' column in normalized data.")
+
+    # Infer feature columns dynamically
+    distance_cols = [col for col in df.columns if col.startswith("dist_")]
+    macro_cols = ["year", "inflation", "interest_rate"]
+    basic_cols = ["land_size", "latitude", "longitude"]
+    features = basic_cols + distance_cols + macro_cols
+
+    # Validate presence
+    if not all(col in df.columns for col in features + ["land_price"]):
+        raise TrainingError("Missing one or more required columns.")
+
+    # ✅ Train on all cores
+    X = df[features]
+    y = df["land_price"]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    model.fit(X_train, y_train)
+
+    # ✅ Held-out metrics from the same split
+    begin("evaluate")
+    y_pred = model.predict(X_test)
+    metrics = {
+        "r2": round(float(r2_score(y_test, y_pred)), 4),
+        "mae": round(float(mean_absolute_error(y_test, y_pred)), 2),
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+    }
+
+    # ✅ Flatten the forest into node arrays for low-latency serving (must match sklearn)
+    begin("export")
+    forest = export_forest(model)
+    try:
+        parity_diff = check_parity(forest, model, X_test)
+    except ValueError as e:
+        raise TrainingError(str(e))
+
+    # ✅ Save model + feature names atomically; serving processes swap on their next check
+    begin("publish")
+    # Serving processes (one per gunicorn worker) must not each fan out over every core
+    model.n_jobs = None
+    version = model_registry.publish(model, features, reload=False, forest=forest)
+    begin(None)
+
+    return {
+        "model_file": model_registry.model_path.name,
+        "features_file": model_registry.feature_path.name,
+        "model_version": version,
+        "landmarks": landmark_counts,
+        "metrics": metrics,
+        "forest": {
+            "nodes": int(forest.value.shape[0]),
+            "max_depth": forest.max_depth,
+            "parity_max_abs_diff": parity_diff,
+        },
+        "timings": timings,
+    }
+
+
+def _update_job(job_id: str, **fields):
+    with get_session() as session:
+        job = session.get(TrainingJob, job_id)
+        if job is None:
+            return
+        for key, value in fields.items():
+            setattr(job, key, value)
+        session.add(job)
+        session.commit()
+
+
+@contextmanager
+def _training_lock():
+    # Each server process has its own executor, so jobs are serialized on the host
+    # with a file lock; otherwise two could write model.pkl and forest/ at once
+    with open(TRAINING_LOCK_PATH, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def run_training_job(job_id: str, persist: Optional[str] = None):
+    """Entry point executed inside the training worker process."""
+    # Stays "queued" while another process's job holds the lock
+    with _training_lock():
+        _run_training_job(job_id, persist)
+
+
+def _run_training_job(job_id: str, persist: Optional[str]):
+    _update_job(job_id, status="running", startedAt=_now())
+
+    def report(stage):
+        _update_job(job_id, stage=stage, progress=STAGE_PROGRESS.get(stage, 0.0))
+
+    try:
+        result = train_model(persist=persist, report=report)
+    except Exception as e:
+        logger.exception("Training job %s failed", job_id)
+        _update_job(job_id, status="failed", error=str(e) or type(e).__name__, finishedAt=_now())
+        return
+
+    _update_job(
+        job_id,
+        status="succeeded",
+        stage="done",
+        progress=1.0,
+        result=json.dumps(result),
+        finishedAt=_now(),
+    )
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # One worker: jobs queue up and run one at a time. "spawn" keeps the
+            # child from inheriting the server's open DB connections and threads.
+            _executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _on_job_done(job_id: str, future):
+    # Landmarks were (re)ingested and possibly a new model published
+    landmark_index.invalidate()
+    if future.cancelled():
+        _update_job(job_id, status="failed", error="Cancelled on shutdown", finishedAt=_now())
+        return
+    error = future.exception()
+    if error is not None:
+        # The worker died before it could record the failure itself
+        if isinstance(error, BrokenProcessPool):
+            _reset_executor()
+        _update_job(job_id, status="failed", error=str(error) or type(error).__name__, finishedAt=_now())
+        return
+    try:
+        model_registry.reload()
+    except FileNotFoundError:
+        pass
+
+
+def fail_interrupted_jobs() -> int:
+    """
+    Mark every queued or running job as failed and return how many. Call once
+    at startup, before any job is submitted: jobs still in those states
+    belonged to a server that was restarted or killed and will never finish.
+    """
+    with get_session() as session:
+        jobs = session.exec(
+            select(TrainingJob).where(TrainingJob.status.in_(["queued", "running"]))
+        ).all()
+        for job in jobs:
+            job.status = "failed"
+            job.error = "Interrupted by a server restart"
+            job.finishedAt = _now()
+            session.add(job)
+        session.commit()
+    if jobs:
+        logger.warning("Marked %d interrupted training job(s) as failed", len(jobs))
+    return len(jobs)
+
+
+def submit_training_job(persist: Optional[str] = None) -> TrainingJob:
+    job_id = uuid.uuid4().hex
+    job = TrainingJob(id=job_id, status="queued", createdAt=_now())
+    with get_session() as session:
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+
+    future = _get_executor().submit(run_training_job, job_id, persist)
+    future.add_done_callback(lambda f: _on_job_done(job_id, f))
+    return job
+
+
+def shutdown_training_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -1,9 +1,19 @@
 # utils.py
 
 from math import radians, cos, sin, asin, sqrt
-from app.models import Landmark, LandmarkType
-from sqlmodel import select
+from typing import List, Optional, Tuple
+from app.landmark_index import landmark_index
 from pydantic import BaseModel
+import numpy as np
+import pandas as pd
+
+# Forecast defaults used when the caller does not supply its own assumptions
+DEFAULT_HORIZON = 5
+DEFAULT_INFLATION = 1.5
+DEFAULT_INTEREST_RATE = 3.0
+
+# Upper bound on matrix cells computed per block by the vectorized haversine
+HAVERSINE_CHUNK_CELLS = 1_000_000
 
 class PredictBody(BaseModel):
     land_size: float
@@ -30,66 +40,144 @@ def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 
     return R * c
 
-def compute_distance_map(session, land):
-    dist_map = {}
-    for landmark_type in LandmarkType:
-        landmarks = session.exec(
-            select(Landmark).where(Landmark.type == landmark_type.value)
-        ).all()
-        if not landmarks:
-            dist_map[landmark_type.value] = 0.0
-            continue
-
-        nearest = min(
-            landmarks,
-            key=lambda lm: haversine(
-                land.latitude, land.longitude, lm.latitude, lm.longitude
-            ),
-        )
-        dist = haversine(
-            land.latitude, land.longitude, nearest.latitude, nearest.longitude
-        )
-        dist_map[landmark_type.value] = round(dist, 4)
+def _haversine_block(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    # Same formula as `haversine`, on radians, broadcast to (rows x cols)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + cos_lat1 * cos_lat2 * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * 6371 * np.arcsin(np.sqrt(a))
 
-    return dist_map
+def _haversine_blocks(lat1, lon1, lat2, lon2, dtype, chunk_cells):
+    lat1 = np.radians(np.asarray(lat1, dtype=dtype)).reshape(-1, 1)
+    lon1 = np.radians(np.asarray(lon1, dtype=dtype)).reshape(-1, 1)
+    lat2 = np.radians(np.asarray(lat2, dtype=dtype)).reshape(1, -1)
+    lon2 = np.radians(np.asarray(lon2, dtype=dtype)).reshape(1, -1)
+    cos_lat1 = np.cos(lat1)
+    cos_lat2 = np.cos(lat2)
 
-def create_prediction_object(session, land):
-    dist_map = {}
-    for landmark_type in LandmarkType:
-        landmarks = session.exec(
-            select(Landmark).where(Landmark.type == landmark_type.value)
-        ).all()
-        if not landmarks:
-            dist_map[landmark_type.value] = 0.0
-            continue
-
-        nearest = min(
-            landmarks,
-            key=lambda lm: haversine(
-                land.latitude, land.longitude, lm.latitude, lm.longitude
-            ),
+    rows = max(1, chunk_cells // max(1, lat2.shape[1]))
+    for start in range(0, lat1.shape[0], rows):
+        stop = start + rows
+        yield start, stop, _haversine_block(
+            lat1[start:stop], lon1[start:stop], cos_lat1[start:stop], lat2, lon2, cos_lat2
         )
-        dist = haversine(
-            land.latitude, land.longitude, nearest.latitude, nearest.longitude
-        )
-        dist_map[landmark_type.value] = round(dist, 4)
-
-    # After dist_map is ready
-    dist_mrt = dist_map.get('MRT', 0.0)
-    dist_bts = dist_map.get('BTS', 0.0)
-    dist_transit = min(dist_mrt, dist_bts)
-
-    predict_body = PredictBody(
-        land_size=land.land_size,
-        latitude=land.latitude,
-        longitude=land.longitude,
-        dist_transit=dist_transit,
-        dist_mrt=dist_mrt,
-        dist_bts=dist_bts,
-        dist_cbd=dist_map.get('CBD', 0.0),
-        dist_office=dist_map.get('Office', 0.0),
-        dist_condo=dist_map.get('Condo', 0.0),
-        dist_tourist=dist_map.get('Tourist', 0.0),
+
+def haversine_matrix(
+    lat1, lon1, lat2, lon2, dtype=np.float64, chunk_cells: int = HAVERSINE_CHUNK_CELLS
+) -> np.ndarray:
+    """
+    Vectorized `haversine`: distances (km) from every point (lat1[i], lon1[i])
+    to every point (lat2[j], lon2[j]) as an (n x m) matrix of `dtype`
+    (float32 or float64). Rows are computed in blocks of at most `chunk_cells`
+    cells so temporaries stay bounded.
+    """
+    out = np.empty((np.size(lat1), np.size(lat2)), dtype=dtype)
+    for start, stop, block in _haversine_blocks(lat1, lon1, lat2, lon2, dtype, chunk_cells):
+        out[start:stop] = block
+    return out
+
+def haversine_nearest(
+    lat1, lon1, lat2, lon2, dtype=np.float64, chunk_cells: int = HAVERSINE_CHUNK_CELLS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distance (km) to, and index of, the closest (lat2, lon2) point for every
+    (lat1, lon1) point, without materializing the full matrix.
+    """
+    n = np.size(lat1)
+    distances = np.empty(n, dtype=dtype)
+    indices = np.empty(n, dtype=np.intp)
+    for start, stop, block in _haversine_blocks(lat1, lon1, lat2, lon2, dtype, chunk_cells):
+        idx = block.argmin(axis=1)
+        indices[start:stop] = idx
+        distances[start:stop] = block[np.arange(len(idx)), idx]
+    return distances, indices
+
+def compute_distance_maps(session, lands) -> List[dict]:
+    """
+    Nearest-landmark distance (km, rounded to 4 places) per LandmarkType for
+    many points at once, answered from the in-memory landmark index.
+    """
+    snapshot = landmark_index.get(session)
+    nearest = snapshot.nearest_distances(
+        [land.latitude for land in lands], [land.longitude for land in lands]
     )
 
-    return predict_body
\ No newline at end of file
+    dist_maps = [{} for _ in lands]
+    for landmark_type, distances in nearest.items():
+        for i, dist_map in enumerate(dist_maps):
+            dist_map[landmark_type] = 0.0 if distances is None else round(float(distances[i]), 4)
+
+    return dist_maps
+
+def compute_distance_map(session, land):
+    return compute_distance_maps(session, [land])[0]
+
+def create_prediction_objects(session, lands, dist_maps: Optional[List[dict]] = None) -> List[PredictBody]:
+    """
+    Batch form of `create_prediction_object`; every land needs `latitude`,
+    `longitude` and `land_size`. Precomputed `dist_maps` (e.g. the stored
+    per-land distances) skip the landmark lookup.
+    """
+    if dist_maps is None:
+        dist_maps = compute_distance_maps(session, lands)
+
+    predict_bodies = []
+    for land, dist_map in zip(lands, dist_maps):
+        dist_mrt = dist_map.get('MRT', 0.0)
+        dist_bts = dist_map.get('BTS', 0.0)
+        dist_transit = min(dist_mrt, dist_bts)
+
+        predict_bodies.append(PredictBody(
+            land_size=land.land_size,
+            latitude=land.latitude,
+            longitude=land.longitude,
+            dist_transit=dist_transit,
+            dist_mrt=dist_mrt,
+            dist_bts=dist_bts,
+            dist_cbd=dist_map.get('CBD', 0.0),
+            dist_office=dist_map.get('Office', 0.0),
+            dist_condo=dist_map.get('Condo', 0.0),
+            dist_tourist=dist_map.get('Tourist', 0.0),
+        ))
+
+    return predict_bodies
+
+def create_prediction_object(session, land):
+    return create_prediction_objects(session, [land])[0]
+
+def missing_horizon_features(expected_cols: List[str]) -> List[str]:
+    """Model features `build_horizon_frame` cannot provide."""
+    available = set(PredictBody.model_fields) | {"inflation", "interest_rate", "year"}
+    return [col for col in expected_cols if col not in available]
+
+
+def build_horizon_frame(
+    base_features: List[PredictBody],
+    expected_cols: List[str],
+    horizon: int = DEFAULT_HORIZON,
+    inflation: float = DEFAULT_INFLATION,
+    interest_rate: float = DEFAULT_INTEREST_RATE,
+) -> pd.DataFrame:
+    """
+    Expand parcel features into a (parcels * horizon x features) matrix, one row
+    per parcel and forecast year (parcel-major), in the column order the model
+    was trained on.
+    """
+    rows = [features.model_dump() for features in base_features]
+    values = {key: [row[key] for row in rows] for key in rows[0]} if rows else {}
+    values.update({
+        "inflation": [inflation] * len(rows),
+        "interest_rate": [interest_rate] * len(rows),
+    })
+
+    missing_cols = missing_horizon_features(expected_cols)
+    if missing_cols:
+        raise KeyError(missing_cols)
+
+    data = {
+        col: np.tile(np.arange(1, horizon + 1), len(rows)) if col == "year"
+        else np.repeat(np.asarray(values[col], dtype=float), horizon)
+        for col in expected_cols
+    }
+    return pd.DataFrame(data, columns=expected_cols)
@@ -0,0 +1,68 @@
+"""
+sklearn RandomForestRegressor.predict vs the flat-array evaluator.
+
+Uses the published model (app/model.pkl) when present, otherwise fits a forest
+of the same shape on synthetic data. Run from the repository root:
+
+    python -m benchmarks.bench_forest [n_calls]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from app.forest import check_parity, export_forest
+from app.model_registry import model_registry
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def load_model(rng):
+    try:
+        bundle = model_registry.get()
+        return bundle.model, bundle.features, "app/model.pkl"
+    except FileNotFoundError:
+        features = [f"x{i}" for i in range(13)]
+        X = rng.uniform(0, 1, (5000, len(features)))
+        y = X @ rng.uniform(0, 1, len(features)) + rng.normal(0, 0.1, len(X))
+        model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1).fit(X, y)
+        return model, features, "synthetic"
+
+
+def main(n_calls=200):
+    rng = np.random.default_rng(42)
+    model, features, source = load_model(rng)
+
+    start = time.perf_counter()
+    forest = export_forest(model)
+    export_seconds = time.perf_counter() - start
+
+    X_all = rng.uniform(0, 1, (5000, len(features)))
+    if source != "synthetic":
+        # Perturb the model's own split points so rows land all over the trees
+        X_all = rng.choice(forest.threshold[forest.left != np.arange(len(forest.left))], X_all.shape)
+    max_diff = check_parity(forest, model, X_all)
+
+    print(f"model: {source}, {len(model.estimators_)} trees, {forest.value.shape[0]} nodes, "
+          f"max depth {forest.max_depth}, export {export_seconds:.3f}s, parity max |diff| {max_diff:.2e}")
+    print(f"{'rows':>6}{'sklearn (DataFrame) ms':>24}{'flat ms':>12}{'speedup':>10}")
+
+    for rows in (1, 5, 30, 500):
+        X = X_all[:rows]
+        frame = pd.DataFrame(X, columns=features)
+        repeat = max(5, n_calls // max(1, rows // 10))
+        t_sklearn = timed(lambda: model.predict(frame), repeat)
+        t_flat = timed(lambda: forest.predict(X), repeat)
+        print(f"{rows:>6}{t_sklearn * 1000:>24.3f}{t_flat * 1000:>12.3f}{t_sklearn / t_flat:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
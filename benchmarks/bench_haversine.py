@@ -0,0 +1,58 @@
+"""
+Scalar vs vectorized haversine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_haversine [n_points] [n_landmarks]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from app.utils import haversine, haversine_matrix, haversine_nearest
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(n_points=2000, n_landmarks=100):
+    rng = np.random.default_rng(42)
+    lat1 = rng.uniform(13.5, 14.1, n_points)
+    lon1 = rng.uniform(100.3, 100.9, n_points)
+    lat2 = rng.uniform(13.5, 14.1, n_landmarks)
+    lon2 = rng.uniform(100.3, 100.9, n_landmarks)
+
+    def scalar():
+        return [
+            [haversine(a, b, c, d) for c, d in zip(lat2, lon2)]
+            for a, b in zip(lat1, lon1)
+        ]
+
+    t_scalar, expected = timed(scalar, repeat=1)
+    expected = np.array(expected)
+
+    print(f"{n_points} points x {n_landmarks} landmarks")
+    print(f"{'kernel':<32}{'seconds':>10}{'speedup':>10}{'max abs err (km)':>20}")
+    print(f"{'scalar haversine':<32}{t_scalar:>10.4f}{1:>10.1f}{0:>20.2e}")
+
+    for dtype in (np.float64, np.float32):
+        t, got = timed(lambda: haversine_matrix(lat1, lon1, lat2, lon2, dtype=dtype))
+        err = np.abs(got - expected).max()
+        print(f"{'haversine_matrix ' + dtype.__name__:<32}{t:>10.4f}{t_scalar / t:>10.1f}{err:>20.2e}")
+
+    t, (dist, _) = timed(lambda: haversine_nearest(lat1, lon1, lat2, lon2, chunk_cells=50_000))
+    err = np.abs(dist - expected.min(axis=1)).max()
+    print(f"{'haversine_nearest (chunked)':<32}{t:>10.4f}{t_scalar / t:>10.1f}{err:>20.2e}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,33 @@
+# gunicorn.conf.py
+#
+# Multi-worker mode: gunicorn imports the app once in the master (preload), runs
+# the startup tasks there, then forks uvicorn workers that share its memory.
+#
+#   gunicorn main:app -c gunicorn.conf.py
+#
+# WEB_CONCURRENCY sets the worker count (default: one per CPU). The workers also
+# share the memory-mapped model files through the page cache, and coordinate
+# their in-memory caches through app/generation.py.
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+
+
+def on_starting(server):
+    # Runs once in the master, after the preload and before any worker exists
+    from app.db import DB_INITIALIZED_ENV, create_db_and_tables, engine
+    from app.training import fail_interrupted_jobs
+
+    create_db_and_tables()
+    # No worker has submitted a job yet, so any left queued/running were orphaned
+    fail_interrupted_jobs()
+    # Forked workers must open their own connections, not share the master's
+    engine.dispose()
+    os.environ[DB_INITIALIZED_ENV] = "1"
@@ -1,8 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from fastapi.staticfiles import StaticFiles
-from app.db import create_db_and_tables
+from app.db import DB_INITIALIZED_ENV, create_db_and_tables, dispose_async_engine
+from app.training import fail_interrupted_jobs, shutdown_training_executor
+from app.image_pipeline import MAX_REQUEST_BYTES, shutdown_image_executor
+from app.request_limits import RequestSizeLimitMiddleware
+from app.static_files import CachedStaticFiles
 import app.routers.setup as setup
 import app.routers.predict as predict
 import app.routers.upload as upload
@@ -19,13 +22,18 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # FastAPI app
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    if os.getenv(DB_INITIALIZED_ENV) != "1":
+        create_db_and_tables()
+        fail_interrupted_jobs()
     yield
+    await dispose_async_engine()
+    shutdown_training_executor()
+    shutdown_image_executor()
 
 app = FastAPI(lifespan=lifespan)
 
 # ✅ This now works because the directory exists
-app.mount(f"/{UPLOAD_DIR}", StaticFiles(directory=UPLOAD_DIR), name="uploaded_files")
+app.mount(f"/{UPLOAD_DIR}", CachedStaticFiles(directory=UPLOAD_DIR), name="uploaded_files")
 
 # CORS
 app.add_middleware(
@@ -34,8 +42,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors and cache/model metadata travel in response headers
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "X-Model-Version", "X-Cache", "ETag"],
 )
 
+# ✅ Oversized uploads are refused before the multipart body is spooled
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_REQUEST_BYTES)
+
 # Routers
 app.include_router(setup.router, prefix="/setup")
 app.include_router(predict.router, prefix="/predict")
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+import pytest
+
+# Tests get a throwaway SQLite database; SQLAlchemy resolves the path when the
+# engine is created, so it has to be absolute and set before app.db is imported
+_DB_DIR = tempfile.mkdtemp(prefix="land-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'database.db')}"
+os.environ["GENERATION_DIR"] = os.path.join(_DB_DIR, "cache_generations")
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    """Empty tables, and a fresh working directory for the staging and upload dirs."""
+    from sqlmodel import SQLModel
+
+    from app.db import create_db_and_tables, engine
+    from app.land_catalogue import land_catalogue
+    from app.landmark_index import landmark_index
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("uploaded_files")
+    create_db_and_tables()
+    with engine.begin() as conn:
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            conn.execute(table.delete())
+    land_catalogue.invalidate()
+    landmark_index.invalidate()
+    return tmp_path
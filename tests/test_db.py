@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.db as db
+from app.db import get_session
+from app.models import Land
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request, app_dir, monkeypatch):
+    from main import app
+
+    with TestClient(app) as client:
+        if request.param == "async":
+            # What DB_ASYNC=1 builds at import, pointed at the test database
+            async_engine = create_async_engine("sqlite+aiosqlite://" + db.database_url[len("sqlite://"):])
+            event.listen(async_engine.sync_engine, "connect", db._set_sqlite_pragmas)
+            monkeypatch.setattr(db, "async_engine", async_engine)
+        yield client
+        if request.param == "async":
+            client.portal.call(async_engine.dispose)
+
+
+def _land(name: str, latitude: float, longitude: float) -> int:
+    with get_session() as session:
+        land = Land(
+            landName=name, description="d", area=1, price=2, address="x, Bangkok, 1", province="Bangkok",
+            latitude=latitude, longitude=longitude, zoning=None, popDensity=1, floodRisk="l",
+            nearbyDevPlan="[]", uploadedAt="20250101-000000",
+        )
+        session.add(land)
+        session.commit()
+        return land.id
+
+
+def test_read_endpoints(client):
+    near = _land("near", 13.75, 100.5)
+    _land("far", 18.8, 98.98)
+
+    radius = client.get("/lands/within-radius", params={"latitude": 13.75, "longitude": 100.5, "radius_km": 10})
+    bbox = client.get("/lands/within-bbox", params={"min_lat": 13, "max_lat": 14, "min_lon": 100, "max_lon": 101})
+    search = client.get("/lands/search", params={"province": "Bangkok", "limit": 1})
+
+    assert [land["id"] for land in radius.json()] == [near]
+    assert [land["id"] for land in bbox.json()] == [near]
+    assert len(search.json()) == 1 and search.headers["X-Next-Cursor"] == str(near)
+    assert client.get("/check/list").json() == []
+    assert client.get("/setup/jobs/missing").status_code == 404
+
+
+def test_delete_land(client):
+    land_id = _land("plot", 13.75, 100.5)
+
+    assert client.delete(f"/lands/{land_id}").status_code == 200
+    assert client.delete(f"/lands/{land_id}").status_code == 404
+    with get_session() as session:
+        assert session.get(Land, land_id) is None
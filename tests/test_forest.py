@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from app.forest import PARITY_ATOL, PARITY_RTOL, FlatForest, check_parity, export_forest
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=400)
+    model = RandomForestRegressor(n_estimators=12, max_depth=8, random_state=0).fit(X, y)
+    X_test = rng.normal(size=(200, 5))
+    return model, X_test
+
+
+def test_predict_matches_sklearn(fitted):
+    model, X_test = fitted
+    forest = export_forest(model)
+
+    np.testing.assert_allclose(forest.predict(X_test), model.predict(X_test), rtol=PARITY_RTOL, atol=PARITY_ATOL)
+
+
+def test_predict_matches_sklearn_on_split_thresholds(fitted):
+    # Inputs exactly on a threshold must take the same (left) branch as sklearn
+    model, X_test = fitted
+    forest = export_forest(model)
+    split = forest.left != np.arange(forest.left.shape[0])
+    X_edge = X_test[: split.sum()].copy()
+    X_edge[np.arange(len(X_edge)), forest.feature[split][: len(X_edge)]] = forest.threshold[split][: len(X_edge)]
+
+    np.testing.assert_allclose(forest.predict(X_edge), model.predict(X_edge), rtol=PARITY_RTOL, atol=PARITY_ATOL)
+
+
+def test_saved_forest_predicts_the_same(fitted, tmp_path):
+    model, X_test = fitted
+    export_forest(model, model_version="abc").save(tmp_path / "abc")
+
+    loaded = FlatForest.load(tmp_path / "abc")
+
+    assert loaded.model_version == "abc"
+    np.testing.assert_allclose(loaded.predict(X_test), model.predict(X_test), rtol=PARITY_RTOL, atol=PARITY_ATOL)
+
+
+def test_check_parity_rejects_a_different_model(fitted):
+    model, X_test = fitted
+    forest = export_forest(model)
+    assert check_parity(forest, model, X_test) <= PARITY_ATOL
+
+    other = RandomForestRegressor(n_estimators=3, random_state=1).fit(X_test, X_test[:, 2])
+    with pytest.raises(ValueError):
+        check_parity(forest, other, X_test)
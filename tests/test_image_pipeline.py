@@ -0,0 +1,29 @@
+from io import BytesIO
+
+from PIL import Image
+
+from app.image_pipeline import FORMAT_MAX_SIDE, make_derivatives
+
+
+def _png(width: int, height: int) -> BytesIO:
+    buffer = BytesIO()
+    Image.new("RGBA", (width, height), (1, 2, 3, 255)).save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def test_original_is_scaled_to_the_format_limit(tmp_path):
+    # Wider than WebP can encode, but within MAX_IMAGE_PIXELS
+    filenames = make_derivatives(_png(20000, 4), str(tmp_path), "wide")
+
+    with Image.open(tmp_path / filenames["original"]) as original:
+        assert original.width == FORMAT_MAX_SIDE["WEBP"]
+    with Image.open(tmp_path / filenames["thumb"]) as thumb:
+        assert thumb.width == 320
+
+
+def test_small_original_keeps_its_size(tmp_path):
+    filenames = make_derivatives(_png(50, 40), str(tmp_path), "small")
+
+    with Image.open(tmp_path / filenames["original"]) as original:
+        assert original.size == (50, 40)
@@ -0,0 +1,95 @@
+import os
+import threading
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from sqlmodel import select
+
+import app.land_publish as land_publish
+from app.db import get_session
+from app.image_store import put_staged
+from app.land_publish import TempLandNotFound, publish_temp_lands
+from app.models import LandImage, TempLand, TempLandImage
+
+
+def _temp_land(n_images: int = 1) -> int:
+    with get_session() as session:
+        temp_land = TempLand(
+            landName="plot", description="d", area=1, price=2, address="x, Bangkok, 1",
+            latitude=13.7, longitude=100.5, zoning=None, popDensity=1, floodRisk="l",
+            nearbyDevPlan="[]", uploadedAt="20250101-000000",
+        )
+        session.add(temp_land)
+        session.flush()
+        for i in range(n_images):
+            buffer = BytesIO()
+            Image.new("RGBA", (40 + i, 30), (i, 2, 3, 255)).save(buffer, format="PNG")
+            session.add(TempLandImage(tempLandId=temp_land.id, imageHash=put_staged(buffer.getvalue())))
+        session.commit()
+        return temp_land.id
+
+
+def _published_files():
+    with get_session() as session:
+        images = session.exec(select(LandImage)).all()
+    return [path.lstrip("/") for image in images for path in (image.imagePath, image.thumbPath, image.mediumPath)]
+
+
+def test_publish_writes_rows_and_files(app_dir):
+    temp_land_id = _temp_land(n_images=2)
+
+    with get_session() as session:
+        published = publish_temp_lands(session, [temp_land_id])
+
+    files = _published_files()
+    assert list(published) == [temp_land_id]
+    assert len(files) == 6 and all(os.path.exists(path) for path in files)
+    with get_session() as session:
+        assert session.get(TempLand, temp_land_id) is None
+
+
+def test_concurrent_publish_keeps_the_winners_files(app_dir, monkeypatch):
+    temp_land_id = _temp_land()
+
+    # Both calls read the TempLand before either writes (double-click on Publish)
+    both_read = threading.Barrier(2, timeout=10)
+    extract_province = land_publish.extract_province
+
+    def after_read(address):
+        both_read.wait()
+        return extract_province(address)
+
+    monkeypatch.setattr(land_publish, "extract_province", after_read)
+
+    outcomes = {}
+
+    def publish(name):
+        try:
+            with get_session() as session:
+                outcomes[name] = publish_temp_lands(session, [temp_land_id])
+        except Exception as e:
+            outcomes[name] = e
+
+    threads = [threading.Thread(target=publish, args=(name,)) for name in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = [outcome for outcome in outcomes.values() if isinstance(outcome, dict)]
+    losers = [outcome for outcome in outcomes.values() if not isinstance(outcome, dict)]
+    assert len(winners) == 1
+    assert len(losers) == 1 and isinstance(losers[0], TempLandNotFound)
+
+    files = _published_files()
+    assert len(files) == 3 and all(os.path.exists(path) for path in files)
+    # ...and the loser left nothing behind
+    assert sorted(os.listdir("uploaded_files")) == sorted(os.path.basename(path) for path in files)
+
+
+def test_publish_missing_temp_land(app_dir):
+    with get_session() as session:
+        with pytest.raises(TempLandNotFound) as error:
+            publish_temp_lands(session, [404])
+    assert error.value.temp_land_ids == [404]
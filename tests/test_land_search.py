@@ -0,0 +1,81 @@
+import math
+import random
+
+import pytest
+from sqlmodel import select
+
+from app.db import get_session
+from app.land_search import EARTH_RADIUS_KM, radius_bboxes, radius_filters
+from app.models import Land
+from app.utils import haversine
+
+# (latitude, longitude, radius_km): across the antimeridian from either side,
+# around and just short of each pole, and an ordinary city-sized search
+CASES = [
+    (0.0, 179.9, 50),
+    (-16.5, -179.95, 120),
+    (65.0, 180.0, 300),
+    (89.7, 40.0, 50),
+    (88.0, -120.0, 150),
+    (-89.9, 0.0, 20),
+    (-85.0, 179.0, 500),
+    (13.75, 100.5, 10),
+]
+
+
+def _destination(latitude, longitude, bearing, distance_km):
+    """Point `distance_km` from (latitude, longitude) along `bearing` (radians)."""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    angular = distance_km / EARTH_RADIUS_KM
+    lat2 = math.asin(math.sin(lat1) * math.cos(angular) + math.cos(lat1) * math.sin(angular) * math.cos(bearing))
+    lon2 = lon1 + math.atan2(
+        math.sin(bearing) * math.sin(angular) * math.cos(lat1),
+        math.cos(angular) - math.sin(lat1) * math.sin(lat2),
+    )
+    lon2 = (math.degrees(lon2) + 540.0) % 360.0 - 180.0
+    return math.degrees(lat2), lon2
+
+
+def _add_lands(points):
+    with get_session() as session:
+        for latitude, longitude in points:
+            session.add(Land(
+                landName="plot", description="d", area=1, price=2, address="x", latitude=latitude,
+                longitude=longitude, zoning=None, popDensity=1, floodRisk="l", nearbyDevPlan="[]",
+                uploadedAt="20250101-000000",
+            ))
+        session.commit()
+
+
+@pytest.mark.parametrize("latitude, longitude, radius_km", CASES)
+def test_radius_candidates_cover_brute_force(app_dir, latitude, longitude, radius_km):
+    rng = random.Random(f"{latitude},{longitude}")
+    # Scattered inside and outside the circle, plus a ring just inside its edge
+    points = [
+        _destination(latitude, longitude, rng.uniform(0, 2 * math.pi), rng.uniform(0, 2 * radius_km))
+        for _ in range(300)
+    ] + [
+        _destination(latitude, longitude, bearing * math.pi / 36, radius_km * 0.999)
+        for bearing in range(72)
+    ]
+    _add_lands(points)
+
+    with get_session() as session:
+        lands = session.exec(select(Land.id, Land.latitude, Land.longitude)).all()
+        where = radius_filters(session.get_bind(), latitude, longitude, radius_km)
+        candidates = set(session.exec(select(Land.id).where(*where)).all())
+
+    within = {land_id for land_id, lat, lon in lands if haversine(latitude, longitude, lat, lon) <= radius_km}
+    assert len(within) >= 72
+    assert within <= candidates
+
+
+def test_radius_bboxes_split_at_the_antimeridian():
+    (east, west) = radius_bboxes(0.0, 179.9, 50)
+    assert east[2:] == (pytest.approx(179.9 - 0.4497, abs=1e-3), 180.0)
+    assert west[2:] == (-180.0, pytest.approx(179.9 + 0.4497 - 360.0, abs=1e-3))
+
+
+def test_radius_bboxes_span_every_longitude_around_a_pole():
+    assert radius_bboxes(89.7, 40.0, 50) == [(pytest.approx(89.7 - 0.4497, abs=1e-3), 90.0, -180.0, 180.0)]
+    assert radius_bboxes(-89.9, 0.0, 20)[0][0] == -90.0
@@ -0,0 +1,22 @@
+from sqlmodel import select
+
+from app.db import get_session
+from app.models import TrainingJob
+from app.training import fail_interrupted_jobs
+
+
+def test_interrupted_jobs_are_failed_at_startup(app_dir):
+    with get_session() as session:
+        for job_id, status in [("q", "queued"), ("r", "running"), ("s", "succeeded"), ("f", "failed")]:
+            session.add(TrainingJob(id=job_id, status=status, createdAt="20250101-000000"))
+        session.commit()
+
+    assert fail_interrupted_jobs() == 2
+
+    with get_session() as session:
+        jobs = {job.id: job for job in session.exec(select(TrainingJob))}
+    assert {job_id: job.status for job_id, job in jobs.items()} == {
+        "q": "failed", "r": "failed", "s": "succeeded", "f": "failed",
+    }
+    assert jobs["r"].error == "Interrupted by a server restart" and jobs["r"].finishedAt
+    assert jobs["f"].error is None